@@ -0,0 +1,325 @@
+"""
+Durable attempt store for JEE Exam Simulator
+SQLite in WAL mode behind a write-behind queue: clicks only enqueue a snapshot,
+a background thread batches every pending attempt into one transaction
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS attempts (
+    attempt_id   TEXT PRIMARY KEY,
+    test_file    TEXT NOT NULL,
+    current      INTEGER NOT NULL,
+    answers      BLOB NOT NULL,   -- array('d'), NaN = unanswered
+    status       BLOB NOT NULL,   -- one status code per question
+    review       BLOB NOT NULL,   -- review-mark bitset
+    deadline     REAL,
+    created_at   REAL NOT NULL,
+    updated_at   REAL NOT NULL,
+    submitted_at REAL,
+    seed         INTEGER,         -- paper seed for attempts drawn from a question pool
+    paper        BLOB,            -- array('q') of the pool question ids on that paper
+    times        BLOB,            -- array('f') seconds spent per question, set on submit
+    bank_version TEXT             -- question_bank version the attempt is pinned to
+)
+"""
+EVENTS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    attempt_id   TEXT NOT NULL,
+    flushed_at   REAL NOT NULL,
+    batch        BLOB NOT NULL    -- event_log batch: times, kinds, questions
+)
+"""
+COLUMNS = ('attempt_id', 'test_file', 'current', 'answers', 'status', 'review',
+           'deadline', 'created_at', 'updated_at', 'submitted_at', 'seed', 'paper', 'times', 'bank_version')
+INDEXES = ("CREATE INDEX IF NOT EXISTS attempts_by_submission ON attempts (test_file, submitted_at)",
+           "CREATE INDEX IF NOT EXISTS events_by_attempt ON events (attempt_id)",
+           "CREATE INDEX IF NOT EXISTS open_attempts_by_deadline ON attempts (deadline) WHERE submitted_at IS NULL")
+# Columns added after the first release, for stores created before them
+MIGRATIONS = (('seed', 'INTEGER'), ('paper', 'BLOB'), ('times', 'BLOB'), ('bank_version', 'TEXT'))
+EVENTS_INSERT = "INSERT INTO events (attempt_id, flushed_at, batch) VALUES (?, ?, ?)"
+UPSERT = f"""
+INSERT INTO attempts ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})
+ON CONFLICT(attempt_id) DO UPDATE SET
+    current = excluded.current, answers = excluded.answers, status = excluded.status,
+    review = excluded.review, deadline = excluded.deadline, updated_at = excluded.updated_at,
+    times = COALESCE(excluded.times, attempts.times),
+    submitted_at = COALESCE(attempts.submitted_at, excluded.submitted_at)
+"""
+
+SUBMITTED_AT, TIMES = COLUMNS.index('submitted_at'), COLUMNS.index('times')
+MAX_RETRY_DELAY = 30  # seconds between attempts to write a batch that keeps failing
+READ_PAGE = 500       # rows iter_attempts() reads per turn on the shared connection
+
+log = logging.getLogger(__name__)
+
+def connect(path):
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(SCHEMA)
+    conn.execute(EVENTS_SCHEMA)
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(attempts)")}
+    for column, kind in MIGRATIONS:
+        if column not in existing:
+            conn.execute(f"ALTER TABLE attempts ADD COLUMN {column} {kind}")
+    for index in INDEXES:
+        conn.execute(index)
+    conn.commit()
+    return conn
+
+def paper_fields(exam):
+    """(seed, paper id blob) for an attempt on a pool paper, (None, None) for a fixed test"""
+    ids = getattr(exam.questions, 'ids', None)
+    if ids is None:
+        return None, None
+    return exam.questions.seed, bytes(ids)
+
+def merge_rows(older, newer):
+    """The newer snapshot of an attempt, keeping a submission or time_spent only the older one has"""
+    if newer[SUBMITTED_AT] is None or newer[TIMES] is None:
+        newer = list(newer)
+        for i in (SUBMITTED_AT, TIMES):
+            if newer[i] is None:
+                newer[i] = older[i]
+        newer = tuple(newer)
+    return newer
+
+def bank_version(exam):
+    """Version of the bank an attempt is pinned to (the pool's, for a pool paper)"""
+    questions = exam.questions
+    return getattr(getattr(questions, 'pool', questions), 'version', None)
+
+class AttemptStore:
+    """Persists exam snapshots; save() never touches the disk on the caller's thread"""
+
+    def __init__(self, path, flush_interval=0.5, batch_size=1000):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._reader = connect(path)
+        self._read_lock = threading.Lock()
+        self._pending = {}   # attempt_id -> latest row; repeated saves coalesce
+        self._inflight = {}  # rows being written, still visible to load()
+        self._events = []    # (attempt_id, flushed_at, batch) waiting to be written
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._closed = False
+        self._flushes = 0
+        self._rows_written = 0
+        self._errors = 0
+        self._writer = threading.Thread(target=self._write_loop, name='attempt-store-writer', daemon=True)
+        self._writer.start()
+
+    def save(self, attempt_id, test_file, exam, created_at=None, submitted=False):
+        """Queue a snapshot of an ExamState for the next batch; returns its updated_at"""
+        now = time.time()
+        seed, paper = paper_fields(exam)
+        row = (attempt_id, test_file, exam.current, bytes(exam.answers), bytes(exam.status),
+               bytes(exam.review), exam.deadline, created_at or now, now, now if submitted else None,
+               seed, paper, bytes(exam.time_spent) if exam.time_spent is not None else None,
+               bank_version(exam))
+        with self._cond:
+            previous = self._pending.get(attempt_id)
+            if previous is not None:
+                row = merge_rows(previous, row)  # keep a queued submission
+            self._pending[attempt_id] = row
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify()
+        return now
+
+    def save_events(self, attempt_id, batch):
+        """Queue one event_log batch for the next write"""
+        with self._cond:
+            self._events.append((attempt_id, time.time(), batch))
+
+    def load_events(self, attempt_id):
+        """Every event batch of an attempt, oldest first"""
+        self._flush_for_read()
+        with self._read_lock:
+            rows = self._reader.execute(
+                "SELECT batch FROM events WHERE attempt_id = ? ORDER BY rowid", (attempt_id,)).fetchall()
+        return [row[0] for row in rows]
+
+    def load(self, attempt_id):
+        """Latest snapshot for an attempt as a dict, or None"""
+        with self._cond:
+            row = self._pending.get(attempt_id) or self._inflight.get(attempt_id)
+        if row is None:
+            with self._read_lock:
+                row = self._reader.execute(
+                    f"SELECT {', '.join(COLUMNS)} FROM attempts WHERE attempt_id = ?", (attempt_id,)).fetchone()
+        return dict(zip(COLUMNS, row)) if row else None
+
+    def revision(self, attempt_id):
+        """updated_at of the newest snapshot, queued or stored"""
+        with self._cond:
+            row = self._pending.get(attempt_id) or self._inflight.get(attempt_id)
+        if row is not None:
+            return row[8]
+        with self._read_lock:
+            row = self._reader.execute("SELECT updated_at FROM attempts WHERE attempt_id = ?", (attempt_id,)).fetchone()
+        return row[0] if row else None
+
+    def submit_expired(self, now=None):
+        """Stamp submitted_at on started attempts whose deadline has passed; returns how many"""
+        now = now or time.time()
+        self._flush_for_read()
+        with self._read_lock:
+            with self._reader:
+                cursor = self._reader.execute(
+                    "UPDATE attempts SET submitted_at = ?, updated_at = ? "
+                    "WHERE submitted_at IS NULL AND deadline <= ?", (now, now, now))
+        return cursor.rowcount
+
+    def iter_attempts(self, test_file=None, submitted_only=True, submitted_after=None, submitted_until=None):
+        """Stream stored attempts without loading them all, optionally within a submission window.
+        Rows come from the shared read connection a page at a time, so the read lock is never
+        held while the caller works through a page."""
+        self._flush_for_read()
+        query = f"SELECT rowid, {', '.join(COLUMNS)} FROM attempts WHERE 1=1"
+        params = []
+        if test_file is not None:
+            query += " AND test_file = ?"
+            params.append(test_file)
+        if submitted_only:
+            query += " AND submitted_at IS NOT NULL"
+        if submitted_after is not None:
+            query += " AND submitted_at > ?"
+            params.append(submitted_after)
+        if submitted_until is not None:
+            query += " AND submitted_at <= ?"
+            params.append(submitted_until)
+        # Each page resumes after the last row of the previous one
+        by_submission = submitted_after is not None or submitted_until is not None
+        if by_submission:
+            page_query = query + " AND (submitted_at, rowid) > (?, ?) ORDER BY submitted_at, rowid LIMIT ?"
+        else:
+            page_query = query + " AND rowid > ? ORDER BY rowid LIMIT ?"
+        last = (float('-inf'), 0) if by_submission else (0,)
+        while True:
+            with self._read_lock:
+                rows = self._reader.execute(page_query, (*params, *last, READ_PAGE)).fetchall()
+            for row in rows:
+                yield dict(zip(COLUMNS, row[1:]))
+            if len(rows) < READ_PAGE:
+                return
+            row = rows[-1]
+            last = (row[1 + SUBMITTED_AT], row[0]) if by_submission else (row[0],)
+
+    def _drain(self, conn):
+        """Take every pending snapshot and write it in one transaction. Rows that
+        fail go back in the queue, behind any newer snapshot of the same attempt;
+        returns the error, or None once everything taken was written."""
+        with self._write_lock:  # keeps batches in queue order across threads
+            with self._cond:
+                self._inflight, self._pending = self._pending, {}
+                events, self._events = self._events, []
+            if not self._inflight and not events:
+                return None
+            rows, error = dict(self._inflight), None
+            try:
+                with conn:
+                    conn.executemany(UPSERT, list(rows.values()))
+                    conn.executemany(EVENTS_INSERT, events)
+                rows, events = {}, []
+            except sqlite3.OperationalError as e:
+                error = e  # locked, disk full, I/O error: the whole batch waits for a retry
+            except Exception as e:
+                # Most likely a bad row, which must not hold back the rest: write them one at a time
+                rows, events, error = self._write_each(conn, rows, events)
+                error = error or e
+            written = len(self._inflight) - len(rows)
+            if written:
+                self._flushes += 1
+                self._rows_written += written
+            with self._cond:
+                for attempt_id, row in rows.items():
+                    newer = self._pending.get(attempt_id)
+                    self._pending[attempt_id] = row if newer is None else merge_rows(row, newer)
+                self._events[:0] = events
+                self._inflight = {}
+            if error is not None:
+                self._errors += 1
+            return error
+
+    def _write_each(self, conn, rows, events):
+        """Write rows and events one transaction each; returns what failed and the last error"""
+        failed_rows, failed_events, error = {}, [], None
+        for attempt_id, row in rows.items():
+            try:
+                with conn:
+                    conn.execute(UPSERT, row)
+            except Exception as e:
+                failed_rows[attempt_id], error = row, e
+        for event in events:
+            try:
+                with conn:
+                    conn.execute(EVENTS_INSERT, event)
+            except Exception as e:
+                failed_events.append(event)
+                error = e
+        return failed_rows, failed_events, error
+
+    def _write_loop(self):
+        conn, delay = None, 0
+        while True:
+            with self._cond:
+                if delay:  # back off after a failed write; saves keep queueing meanwhile
+                    retry_at = time.monotonic() + delay
+                    while not self._closed and time.monotonic() < retry_at:
+                        self._cond.wait(retry_at - time.monotonic())
+                elif not self._closed and len(self._pending) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+                closed = self._closed
+            try:
+                conn = conn or connect(self.path)
+                error = self._drain(conn)
+            except Exception as e:  # the writer thread must outlive any error
+                error = e
+            if error is None:
+                delay = 0
+            else:
+                delay = min(MAX_RETRY_DELAY, max(self.flush_interval, 2 * delay))
+                log.error("attempt store write failed, %d rows kept queued, retrying in %.1fs: %s",
+                          self.stats()['pending'], delay, error)
+            if closed:
+                if conn is not None:
+                    conn.close()
+                return
+
+    def flush(self):
+        """Write everything queued so far on the calling thread; raises if some of it
+        could not be written (it stays queued for the writer thread to retry)"""
+        with self._read_lock:
+            error = self._drain(self._reader)
+        if error is not None:
+            raise error
+
+    def _flush_for_read(self):
+        """Flush before a read so callers see their own saves; a failed write is left
+        to the writer thread's retries rather than failing the read"""
+        with self._read_lock:
+            error = self._drain(self._reader)
+        if error is not None:
+            log.warning("attempt store write failed before a read: %s", error)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._writer.join()
+        try:
+            self.flush()
+        finally:
+            self._reader.close()
+
+    def stats(self):
+        with self._cond:
+            pending = len(self._pending) + len(self._events)
+        return {'pending': pending, 'flushes': self._flushes, 'rows_written': self._rows_written,
+                'errors': self._errors}
@@ -0,0 +1,144 @@
+"""
+Question bank size and load time: JSON against JSONL, gzip and zstd
+Usage: python benchmarks/bench_bank_formats.py [--questions 50000] [--repeat 3] [--mbps 50]
+
+Writes one synthetic bank as indented JSON (what generate_questions.py writes
+by default), plain JSONL and compressed JSONL, and times parse_bank() on each
+from a warm page cache. The second table reads every file through a disk
+throttled to --mbps so I/O costs something: "whole file" reads and
+decompresses everything before parsing a line, "streamed" is iter_jsonl(),
+where the reader thread fetches and decompresses the next chunks while
+earlier lines are parsed.
+"""
+
+import argparse
+import json
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from question_bank import iter_jsonl, open_jsonl, parse_bank, write_jsonl  # noqa: E402
+
+SUBJECTS = ('Physics', 'Chemistry', 'Mathematics')
+PHRASES = ("A block of mass $m$ slides down an incline of angle $\\theta$",
+           "The equilibrium constant $K_c$ for the reaction at $298\\,K$ is",
+           "If $f(x) = \\frac{x^2 + 1}{x - 1}$, then $\\lim_{x \\to \\infty} f(x)$ equals",
+           "A charge $q$ is placed at the centre of a cube of side $a$",
+           "The number of real solutions of $\\sin^{-1} x + \\cos^{-1} x^2 = \\frac{\\pi}{2}$ is",
+           "Which of the following compounds shows geometrical isomerism?")
+
+_words = random.Random(1)
+# Made-up words so the text does not compress far better than a real bank would
+WORDS = sorted({''.join(_words.choice(string.ascii_lowercase) for _ in range(_words.randrange(3, 10)))
+                for _ in range(5000)})
+
+def make_questions(n, rng):
+    questions = []
+    for i in range(n):
+        words = ' '.join(rng.choice(WORDS) for _ in range(rng.randrange(8, 20)))
+        stem = f"{rng.choice(PHRASES)} {words} (value {rng.randrange(1, 10 ** 6)})"
+        questions.append({'id': i + 1, 'subject': SUBJECTS[i % 3], 'type': 'mcq', 'question': stem,
+                          'options': [f"${rng.randrange(1, 999)}\\sqrt{{{rng.randrange(2, 9)}}}$" for _ in range(4)],
+                          'correct': rng.randrange(4),
+                          'solution': f"Using $F = ma$ and $v^2 = u^2 + 2as$: {stem.lower()} gives {rng.random():.4f}",
+                          'is_latex': True})
+    return questions
+
+class ThrottledFile:
+    """Binary file whose reads take as long as a disk doing mbps megabytes/s"""
+
+    def __init__(self, path, mbps):
+        self._f = open(path, 'rb')
+        self._seconds_per_byte = 1 / (mbps * 1e6)
+
+    def read(self, size=-1):
+        data = self._f.read(size)
+        time.sleep(len(data) * self._seconds_per_byte)
+        return data
+
+    def readable(self):
+        return True
+
+    def close(self):
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def whole_file(path, mbps):
+    """Read (and decompress) everything, then parse"""
+    with ThrottledFile(path, mbps) as raw:
+        if path.endswith('.json'):
+            return json.loads(raw.read())
+        with open_jsonl(path, 'rb', raw) as f:
+            data = f.read()
+    return json.loads(b'[' + b','.join(line for line in data.split(b'\n') if line.strip()) + b']')
+
+def streamed(path, mbps):
+    with ThrottledFile(path, mbps) as raw:
+        return list(iter_jsonl(path, raw))
+
+def best(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--questions', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--mbps', type=float, default=50, help="throttled disk speed for the streaming table")
+    args = parser.parse_args()
+    questions = make_questions(args.questions, random.Random(11))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = [os.path.join(tmp, 'questions_bench.json')]
+        with open(files[0], 'w', encoding='utf-8') as f:
+            json.dump(questions, f, indent=2, ensure_ascii=False)
+        for suffix in ('.jsonl', '.jsonl.gz', '.jsonl.zst'):
+            path = os.path.join(tmp, 'questions_bench' + suffix)
+            started = time.perf_counter()
+            try:
+                write_jsonl(path, questions)
+            except ImportError as e:
+                print(f"⚠️  skipping {suffix}: {e}")
+                continue
+            print(f"✏️  wrote {suffix:<10} in {time.perf_counter() - started:.2f}s")
+            files.append(path)
+
+        base_size, base_load = os.path.getsize(files[0]), None
+        print(f"\n📚 {args.questions} questions, parse_bank() from the page cache")
+        for path in files:
+            size = os.path.getsize(path)
+            load = best(lambda: parse_bank(path), args.repeat)
+            base_load = base_load or load
+            assert len(parse_bank(path)) == args.questions
+            print(f"   {Path(path).name:<26}{size / 1e6:>8.1f} MB ({size / base_size:>4.0%})"
+                  f"{load * 1000:>9.0f} ms ({load / base_load:>4.0%})")
+
+        print(f"\n💾 through a {args.mbps:g} MB/s disk: whole file first vs streamed")
+        for path in files:
+            whole = best(lambda: whole_file(path, args.mbps), args.repeat)
+            if path.endswith('.json'):
+                print(f"   {Path(path).name:<26}{whole * 1000:>9.0f} ms         (a JSON array cannot be streamed)")
+                continue
+            stream = best(lambda: streamed(path, args.mbps), args.repeat)
+            assert len(streamed(path, args.mbps)) == args.questions
+            print(f"   {Path(path).name:<26}{whole * 1000:>9.0f} ms {stream * 1000:>7.0f} ms"
+                  f"  ({1 - stream / whole:.0%} faster)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""
+Bank lookups while question files are being rewritten
+Usage: python benchmarks/bench_bank_reload.py [--questions 3000] [--readers 8] [--seconds 5]
+
+Reader threads play sessions: each takes a bank as an attempt would, holds it
+for a while and calls get_bank() on every click. The run is repeated while a
+writer rewrites the file every 0.2 s (changing answers each time) so the
+watcher keeps loading new versions. Reported: lookup latency without and with
+reloads, reloads done in the background, whether any held bank changed under
+its holder, and how many versions are still in memory once every holder lets go.
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('JEE_BANK_WATCH_INTERVAL', '0.05')
+os.environ.setdefault('JEE_BANK_SNAPSHOT_DIR', tempfile.mkdtemp(prefix='bench_bank_versions_'))
+
+import question_bank  # noqa: E402  (reads both settings on import)
+
+def make_questions(n, revision):
+    return [{'id': i, 'subject': ('Physics', 'Chemistry', 'Mathematics')[i % 3], 'type': 'mcq',
+             'question': f"Question {i}", 'options': ['A', 'B', 'C', 'D'],
+             'answer': (i + revision) % 4, 'solution': f"Revision {revision}"} for i in range(n)]
+
+def write_bank(path, questions):
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(questions, f)
+    os.replace(tmp, path)
+
+def reader(path, stop, latencies, broken):
+    rng = random.Random()
+    while not stop.is_set():
+        pinned = question_bank.get_bank(path)  # start of an attempt
+        first = pinned[0]['solution']
+        for _ in range(rng.randrange(20, 200)):
+            time.sleep(0.001)  # think time between clicks
+            started = time.perf_counter()
+            question_bank.get_bank(path)
+            latencies.append((time.perf_counter() - started) * 1e6)
+            if pinned[0]['solution'] != first:
+                broken.append(path)
+        del pinned
+
+def run(path, args, rewrite):
+    """Readers for args.seconds, rewriting the bank every 0.2 s if asked; returns latencies, holder breaks, rewrites"""
+    stop, latencies, broken = threading.Event(), [], []
+    threads = [threading.Thread(target=reader, args=(path, stop, latencies, broken))
+               for _ in range(args.readers)]
+    for t in threads:
+        t.start()
+    revision, deadline = 0, time.monotonic() + args.seconds
+    while time.monotonic() < deadline:
+        time.sleep(0.2)
+        if rewrite:
+            revision += 1
+            write_bank(path, make_questions(args.questions, revision))
+    stop.set()
+    for t in threads:
+        t.join()
+    return sorted(latencies), broken, revision
+
+def report(label, latencies):
+    quantile = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+    print(f"⏱️  {label:<16}{len(latencies):>8} lookups: p50 {statistics.median(latencies):.1f} µs, "
+          f"p99 {quantile(0.99):.1f} µs, p99.9 {quantile(0.999):.1f} µs, max {latencies[-1] / 1000:.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--questions', type=int, default=3000)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'questions_reload.json')
+        write_bank(path, make_questions(args.questions, 0))
+        started = time.perf_counter()
+        question_bank.get_bank(path)
+        cold_ms = (time.perf_counter() - started) * 1000
+        quiet, _, _ = run(path, args, rewrite=False)
+        busy, broken, rewrites = run(path, args, rewrite=True)
+        time.sleep(question_bank.WATCH_INTERVAL * 4)  # let the watcher pick up the last write
+        gc.collect()
+        stats = question_bank.cache_stats()
+
+    print(f"📚 {args.questions} questions, first load {cold_ms:.1f} ms")
+    report('no reloads', quiet)
+    report('reloading', busy)
+    print(f"✏️  {rewrites} rewrites, {stats['reloads']} reloads in the background, {stats['errors']} failed")
+    print(f"📌 {len(broken)} lookups saw a held bank change")
+    print(f"🧹 {stats['versions']} version(s) in memory after every holder let go")
+    return 1 if broken or stats['versions'] > 1 else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
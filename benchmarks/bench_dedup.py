@@ -0,0 +1,102 @@
+"""
+Near-duplicate index on a large synthetic library
+Usage: python benchmarks/bench_dedup.py [--questions 20000] [--banks 8] [--planted 500]
+
+Writes --banks question files with --questions in total, then plants
+near-copies of --planted questions in other banks: reworded LaTeX (\\dfrac for
+\\frac, \\left( for (), extra spacing, case, one changed word). Reports how many
+planted pairs were found, how many other pairs were reported, time to hash
+every bank from scratch, and time to rerun after adding one more bank, which
+should hash only that bank.
+"""
+
+import argparse
+import json
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from dedup_index import build_index, find_duplicates  # noqa: E402
+
+_words = random.Random(1)
+# Made-up words over the whole alphabet; a small vocabulary would make unrelated questions share most 4-grams
+WORDS = sorted({''.join(_words.choice(string.ascii_lowercase) for _ in range(_words.randrange(3, 10)))
+                for _ in range(5000)})
+
+def make_question(rng, qid):
+    words = ' '.join(rng.choice(WORDS) for _ in range(rng.randrange(18, 40)))
+    a, b, c = rng.randrange(2, 99), rng.randrange(2, 99), rng.randrange(2, 9)
+    text = f"A {words} has $\\frac{{{a}}}{{{b}}}$ and $(x^{c} + {a})$. Find the value of {rng.choice(WORDS)}."
+    return {'id': qid, 'subject': rng.choice(('Physics', 'Chemistry', 'Mathematics')), 'type': 'mcq',
+            'question': text, 'options': [f"${rng.randrange(1, 999)}$" for _ in range(4)], 'correct': 0,
+            'solution': '', 'is_latex': True}
+
+def reword(rng, q, qid):
+    text = q['question'].replace('\\frac', '\\dfrac').replace('$(', '$\\left(').replace(')$', '\\right)$')
+    words = text.split(' ')
+    words[rng.randrange(1, 10)] = rng.choice(WORDS)  # one changed word
+    text = '  '.join(words).replace('A ', 'a ', 1)
+    return {**q, 'id': qid, 'question': text}
+
+def write(path, questions):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(questions, f)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--questions', type=int, default=20000)
+    parser.add_argument('--banks', type=int, default=8)
+    parser.add_argument('--planted', type=int, default=500)
+    parser.add_argument('--threshold', type=float, default=0.8)
+    args = parser.parse_args()
+    rng = random.Random(7)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index_dir = os.path.join(tmp, '.dedup')
+        banks = [[] for _ in range(args.banks)]
+        for qid in range(args.questions):
+            banks[qid % args.banks].append(make_question(rng, qid))
+        planted = set()
+        for source in rng.sample(range(args.questions), args.planted):
+            original = banks[source % args.banks][source // args.banks]
+            target = (source + rng.randrange(1, args.banks)) % args.banks
+            copy_id = args.questions + len(planted)
+            banks[target].append(reword(rng, original, copy_id))
+            planted.add((source, copy_id))
+        files = []
+        for n, questions in enumerate(banks):
+            files.append(os.path.join(tmp, f"questions_bench{n}.json"))
+            write(files[-1], questions)
+
+        started = time.perf_counter()
+        _, signatures, rows = build_index(files, index_dir)
+        cold = time.perf_counter() - started
+        started = time.perf_counter()
+        groups = find_duplicates(signatures, args.threshold)
+        search = time.perf_counter() - started
+
+        ids = [int(bank.ids[pos]) for bank, pos in rows]
+        found = {tuple(sorted((ids[a], ids[b]))) for _, edges in groups for a, b, _ in edges}
+        hits = len(planted & found)
+
+        extra = os.path.join(tmp, 'questions_extra.json')
+        write(extra, [make_question(rng, 10 ** 7 + i) for i in range(args.questions // args.banks)])
+        started = time.perf_counter()
+        indexed, _, _ = build_index(files + [extra], index_dir)
+        warm = time.perf_counter() - started
+
+    total = len(rows)
+    print(f"📚 {total} questions in {args.banks} banks, {args.planted} planted near-copies")
+    print(f"🔎 hashed in {cold:.2f}s ({cold / total * 1e6:.0f} µs/question), searched in {search:.2f}s")
+    print(f"🎯 found {hits}/{len(planted)} planted pairs, {len(found - planted)} other pairs")
+    print(f"➕ one more bank: {warm:.2f}s, hashed {sum(len(b.ids) for b in indexed if not b.cached)} questions")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
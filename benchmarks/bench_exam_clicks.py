@@ -0,0 +1,113 @@
+"""
+Per-click server time and payload for the exam interface
+Usage: python benchmarks/bench_exam_clicks.py [--clicks 50]
+
+Drives jee_exam_app.py through Streamlit's AppTest. Every interaction is
+measured twice: as a full script rerun (what every click cost before the exam
+interface was split into fragments) and as the fragment-scoped rerun the
+browser actually requests. Payload is the serialized size of the ForwardMsgs
+the server would send for that rerun.
+"""
+
+import argparse
+import statistics
+import time
+from pathlib import Path
+
+import streamlit.testing.v1.local_script_runner as local_script_runner
+from streamlit.runtime.scriptrunner import RerunData, ScriptRunnerEvent
+from streamlit.testing.v1 import AppTest
+
+APP = str(Path(__file__).resolve().parent.parent / 'jee_exam_app.py')
+
+class RerunProbe:
+    """Hooks AppTest's script runner to scope reruns and record what is sent"""
+
+    def __init__(self):
+        self.fragment_id = None
+        self.payload = 0
+        self.fragments = {}  # fragment id -> widget keys drawn inside it
+        self._install()
+
+    def _install(self):
+        probe = self
+        original_init = local_script_runner.LocalScriptRunner.__init__
+
+        def rerun_data(**kwargs):
+            if probe.fragment_id:
+                kwargs.update(fragment_id_queue=[probe.fragment_id], is_fragment_scoped_rerun=True)
+            return RerunData(**kwargs)
+
+        def init(runner, *args, **kwargs):
+            original_init(runner, *args, **kwargs)
+            runner.on_event.connect(probe._on_event, weak=False)
+
+        local_script_runner.RerunData = rerun_data
+        local_script_runner.LocalScriptRunner.__init__ = init
+
+    def _on_event(self, sender, event, **kwargs):
+        if event != ScriptRunnerEvent.ENQUEUE_FORWARD_MSG:
+            return
+        msg = kwargs['forward_msg']
+        self.payload += msg.ByteSize()
+        if msg.HasField('delta') and msg.delta.fragment_id:
+            element = msg.delta.new_element
+            kind = element.WhichOneof('type')
+            widget = getattr(element, kind, None) if kind else None
+            key = getattr(widget, 'id', '') if widget is not None else ''
+            self.fragments.setdefault(msg.delta.fragment_id, set()).add(key)
+
+    def fragment_with(self, key):
+        """Outermost fragment that drew a widget whose id contains key"""
+        owners = [f for f, ids in self.fragments.items() if any(key in i for i in ids)]
+        return max(owners, key=lambda f: len(self.fragments[f]), default=None)
+
+    def measure(self, at, action, fragment_id=None):
+        self.fragment_id, self.payload = fragment_id, 0
+        started = time.perf_counter()
+        action(at).run()
+        elapsed = time.perf_counter() - started
+        self.fragment_id = None
+        return elapsed, self.payload
+
+def button(at, label):
+    return next(b for b in at.button if label in b.label)
+
+INTERACTIONS = {
+    'palette': lambda at, i: at.radio(key='palette').set_value((i * 7) % len(at.radio(key='palette').options)),
+    'save': lambda at, i: button(at, 'Save'),
+    'mark': lambda at, i: button(at, 'Mark'),
+}
+
+def start_exam(probe):
+    at = AppTest.from_file(APP, default_timeout=30)
+    at.run()
+    at.button[0].click().run()
+    button(at, 'Start').click().run()
+    probe.fragments.clear()
+    at.run()
+    return at
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clicks', type=int, default=50)
+    args = parser.parse_args()
+
+    probe = RerunProbe()
+    at = start_exam(probe)
+    body = probe.fragment_with('palette')
+
+    print(f"{'interaction':<12}{'scope':<10}{'median ms':>10}{'p95 ms':>10}{'bytes':>10}")
+    for name, interaction in INTERACTIONS.items():
+        for scope, fragment_id in (('full', None), ('fragment', body)):
+            times, sizes = [], []
+            for i in range(args.clicks):
+                elapsed, size = probe.measure(at, lambda at: interaction(at, i), fragment_id)
+                times.append(elapsed * 1000)
+                sizes.append(size)
+            times.sort()
+            print(f"{name:<12}{scope:<10}{statistics.median(times):>10.2f}"
+                  f"{times[int(len(times) * 0.95) - 1]:>10.2f}{int(statistics.median(sizes)):>10}")
+
+if __name__ == "__main__":
+    main()
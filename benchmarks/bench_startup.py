@@ -0,0 +1,63 @@
+"""
+Cold-start time of the core modules and command-line tools
+Usage: python benchmarks/bench_startup.py [--runs 10] [--budget-ms 100]
+
+Each target is imported (or run with --help) in a fresh interpreter, so the
+numbers include everything a batch job pays before doing work. The bare
+interpreter start and the numpy import are reported first for reference; a
+target fails if it goes over the budget or drags in streamlit.
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+MODULES = ('jee_core', 'question_bank', 'exam_state', 'test_catalog', 'question_pool',
+           'event_log', 'state_backend', 'grading', 'cohort_analytics')
+TOOLS = ('compile_bank.py', 'build_bank.py', 'bulk_score.py', 'cohort_analytics.py', 'dedup_index.py',
+         'export_reports.py')
+
+def run(argv):
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, *argv], cwd=ROOT, capture_output=True, text=True)
+    elapsed = (time.perf_counter() - started) * 1000
+    return elapsed, proc
+
+def measure(argv, runs):
+    times = []
+    for _ in range(runs):
+        elapsed, proc = run(argv)
+        if proc.returncode:
+            raise SystemExit(f"{' '.join(argv)} failed:\n{proc.stderr}")
+        times.append(elapsed)
+    return statistics.median(times)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--budget-ms', type=float, default=100)
+    args = parser.parse_args()
+
+    baseline = measure(['-c', 'pass'], args.runs)
+    numpy = measure(['-c', 'import numpy'], args.runs) - baseline
+    print(f"{'interpreter':<28}{baseline:>8.1f} ms")
+    print(f"{'numpy (import only)':<28}{numpy:>8.1f} ms\n")
+
+    check = "import sys, {0}; sys.exit('streamlit' in sys.modules)"
+    targets = [(m, ['-c', check.format(m)]) for m in MODULES] + [(t, [t, '--help']) for t in TOOLS]
+    over = []
+    print(f"{'target':<28}{'median':>8}  (budget {args.budget_ms:.0f} ms)")
+    for name, argv in targets:
+        ms = measure(argv, args.runs)
+        print(f"{name:<28}{ms:>8.1f} ms {'✅' if ms <= args.budget_ms else '❌'}")
+        if ms > args.budget_ms:
+            over.append(name)
+    return 1 if over else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
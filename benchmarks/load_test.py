@@ -0,0 +1,218 @@
+"""
+Concurrent-student load test for the exam app
+Usage: python benchmarks/load_test.py [--students 20] [--processes 1] [--answers 15]
+                                      [--save baseline.json] [--compare baseline.json]
+
+Every simulated student drives the real jee_exam_app.py through its own
+AppTest session: open the test, start it, answer, save, mark, jump around the
+palette, submit and open a solution. All students of one process are live at
+once and take turns one interaction at a time, the way one app instance
+interleaves its sessions' reruns under the GIL; --processes runs several such
+instances against the same state backend.
+
+Reported per interaction type are rerun latency percentiles; overall,
+interactions/s and students/min; and the memory each live session holds
+(traced in a separate pass so tracing doesn't skew the timings). AppTest
+always reruns the whole script, so latencies are an upper bound on the
+fragment-scoped reruns a browser triggers (see bench_exam_clicks.py).
+Run it from the directory holding the question files.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from multiprocessing import Pool
+
+from streamlit.testing.v1 import AppTest
+
+from bench_exam_clicks import APP, button
+
+PERCENTILES = (50, 90, 99)
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p / 100))]
+
+class Recorder:
+    """Latencies per interaction type"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def run(self, name, at, element=None):
+        started = time.perf_counter()
+        (element if element is not None else at).run()
+        self.latencies[name].append((time.perf_counter() - started) * 1000)
+        if at.exception:
+            self.errors[name] += 1
+        return at
+
+def answer(at, exam):
+    """Set a plausible answer on the current question's input"""
+    q = exam.questions[exam.current]
+    key = f"q_{exam.current}"
+    if q['type'] == 'mcq':
+        return at.radio(key=key).set_value(exam.current % len(q['options']))
+    return at.number_input(key=key).set_value(exam.current % 10)
+
+def student(recorder, test_index, answers):
+    """One student's whole attempt, yielding after every interaction"""
+    at = AppTest.from_file(APP, default_timeout=60)
+    recorder.run('landing', at)
+    yield
+    recorder.run('open_test', at, at.button[test_index].click())
+    yield
+    recorder.run('start', at, button(at, 'Start').click())
+    yield
+    for n in range(answers):
+        exam = at.session_state.exam
+        recorder.run('answer', at, answer(at, exam))
+        yield
+        if n % 7 == 6:
+            target = (exam.current * 5 + 3) % len(exam)
+            recorder.run('palette', at, at.radio(key='palette').set_value(target))
+        elif n % 5 == 4:
+            recorder.run('mark', at, button(at, 'Mark').click())
+        else:
+            recorder.run('save', at, button(at, 'Save').click())
+        yield
+    recorder.run('submit', at, button(at, 'Submit').click())
+    yield
+    recorder.run('results', at, next(b for b in at.button if b.key and b.key.startswith('sol_')).click())
+
+def run_instance(config):
+    """Drive `students` live sessions round-robin in this process; returns raw latencies"""
+    students, test_index, answers = config
+    recorder = Recorder()
+    active = [student(recorder, test_index, answers) for _ in range(students)]
+    while active:
+        for attempt in list(active):
+            try:
+                next(attempt)
+            except StopIteration:
+                active.remove(attempt)
+    return dict(recorder.latencies), dict(recorder.errors)
+
+def measure_memory(sessions, test_index, answers):
+    """Traced bytes per live session after an attempt is under way"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    recorder, held = Recorder(), []
+    for _ in range(sessions):
+        at = AppTest.from_file(APP, default_timeout=60)
+        at.run()
+        at.button[test_index].click().run()
+        button(at, 'Start').click().run()
+        for _ in range(answers):
+            recorder.run('answer', at, answer(at, at.session_state.exam))
+            button(at, 'Save').click().run()
+        held.append(at)
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    growth = sum(s.size_diff for s in after.compare_to(before, 'filename'))
+    exam_bytes = held[-1].session_state.exam.nbytes()
+    return {'sessions': sessions, 'bytes_per_session': growth // sessions, 'exam_state_bytes': exam_bytes}
+
+def summarize(recorder, wall, students):
+    interactions = {}
+    for name, values in recorder.latencies.items():
+        values = sorted(values)
+        interactions[name] = {
+            'count': len(values),
+            'mean_ms': round(statistics.fmean(values), 2),
+            **{f"p{p}_ms": round(percentile(values, p), 2) for p in PERCENTILES},
+            'max_ms': round(values[-1], 2),
+            'errors': recorder.errors.get(name, 0),
+        }
+    total = sum(len(v) for v in recorder.latencies.values())
+    return {
+        'interactions': interactions,
+        'throughput': {
+            'wall_s': round(wall, 2),
+            'interactions_per_s': round(total / wall, 1),
+            'students_per_min': round(students * 60 / wall, 1),
+        },
+    }
+
+def print_report(report, baseline=None):
+    def delta(section, name, field):
+        if not baseline:
+            return ''
+        old = baseline.get(section, {}).get(name, {}).get(field)
+        new = report[section][name][field]
+        return f" ({(new - old) / old * 100:+.0f}%)" if old else ''
+
+    print(f"{'interaction':<12}{'count':>7}" + ''.join(f"{f'p{p} ms':>18}" for p in PERCENTILES) + f"{'errors':>8}")
+    for name, row in report['interactions'].items():
+        cells = ''.join(f"{row[f'p{p}_ms']:>9.1f}{delta('interactions', name, f'p{p}_ms'):<9}" for p in PERCENTILES)
+        print(f"{name:<12}{row['count']:>7}{cells}{row['errors']:>8}")
+    t = report['throughput']
+    print(f"\n{t['interactions_per_s']} interactions/s, {t['students_per_min']} students/min over {t['wall_s']}s")
+    if baseline:
+        old = baseline['throughput']
+        print(f"   baseline: {old['interactions_per_s']} interactions/s, {old['students_per_min']} students/min")
+    if 'memory' in report:
+        m = report['memory']
+        print(f"Memory: {m['bytes_per_session'] / 1024:.0f} KiB per session "
+              f"({m['exam_state_bytes']} B of exam state), traced over {m['sessions']} sessions")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--students', type=int, default=20)
+    parser.add_argument('--processes', type=int, default=1, help="app instances, students split between them")
+    parser.add_argument('--answers', type=int, default=15, help="questions each student answers")
+    parser.add_argument('--test', type=int, default=0, help="index of the test button to open")
+    parser.add_argument('--memory-sessions', type=int, default=10, help="0 to skip the memory pass")
+    parser.add_argument('--save', help="write the results as a baseline JSON file")
+    parser.add_argument('--compare', help="baseline JSON file to compare against")
+    args = parser.parse_args()
+
+    # Keep the benchmark's attempts out of the real store
+    scratch = tempfile.mkdtemp(prefix='jee-load-')
+    os.environ.setdefault('JEE_STATE_BACKEND', f"sqlite:///{os.path.join(scratch, 'attempts.db')}")
+
+    recorder = Recorder()
+    shares = [args.students // args.processes + (i < args.students % args.processes) for i in range(args.processes)]
+    started = time.perf_counter()
+    if args.processes == 1:
+        results = [run_instance((args.students, args.test, args.answers))]
+    else:
+        with Pool(args.processes) as pool:
+            results = pool.map(run_instance, [(n, args.test, args.answers) for n in shares if n])
+    for latencies, errors in results:
+        for name, values in latencies.items():
+            recorder.latencies[name].extend(values)
+        for name, count in errors.items():
+            recorder.errors[name] += count
+    report = summarize(recorder, time.perf_counter() - started, args.students)
+    if args.memory_sessions:
+        report['memory'] = measure_memory(args.memory_sessions, args.test, min(args.answers, 5))
+    report['config'] = {k: getattr(args, k) for k in ('students', 'processes', 'answers', 'test')}
+    report['environment'] = {'python': platform.python_version(), 'platform': platform.platform(),
+                             'cpus': os.cpu_count(), 'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved baseline to {args.save}")
+    return 1 if any(recorder.errors.values()) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+"""
+Streaming question-bank builder for large multi-source banks
+Usage: python build_bank.py SOURCE [SOURCE ...] --out questions_big [--format qbank|shards]
+                            [--shard-size 5000] [--workers N] [--errors errors.jsonl]
+
+Sources are CSV or JSONL (plain, .gz or .zst). CSV columns: id, subject, type, question, solution,
+correct and either option_a..option_d or a single `options` column separated by |.
+Records are validated in a process pool and written as they arrive, so memory
+stays flat however large the bank is. The per-subject, per-type counts are then
+checked against the paper blueprint: a test (questions_*) must match it exactly,
+a pool (pool_*) must hold at least one paper's worth of every section.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import Counter
+from multiprocessing import Pool
+
+from compile_bank import BankWriter
+from jee_core import MARKING_SCHEME, SUBJECTS, chunked
+from question_bank import iter_jsonl
+from question_pool import DEFAULT_BLUEPRINT
+
+QUESTION_TYPES = tuple(MARKING_SCHEME)
+SUBJECT_NAMES = {s.lower(): s for s in SUBJECTS}
+OPTION_COLUMNS = ('option_a', 'option_b', 'option_c', 'option_d')
+
+def read_source(filename):
+    """Yield raw records from a CSV or JSONL (optionally .gz / .zst) file"""
+    if not filename.endswith('.csv'):
+        yield from iter_jsonl(filename)
+        return
+    with open(filename, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f):
+            yield row
+
+def normalize(record):
+    """Coerce a CSV/JSONL record into the questions.json shape"""
+    q = dict(record)
+    if 'options' in q and isinstance(q['options'], str):
+        q['options'] = [o.strip() for o in q['options'].split('|')] if q['options'].strip() else None
+    elif any(c in q for c in OPTION_COLUMNS):
+        options = [q.pop(c, '') or '' for c in OPTION_COLUMNS]
+        q['options'] = options if any(options) else None
+    q['id'] = int(q['id'])
+    q['type'] = str(q.get('type', '')).strip().lower()
+    subject = str(q.get('subject', '')).strip()
+    q['subject'] = SUBJECT_NAMES.get(subject.lower(), subject)
+    if q['type'] == 'decimal':
+        q['correct'] = float(q['correct'])
+    else:
+        q['correct'] = int(float(q['correct']))
+    q['is_latex'] = str(q.get('is_latex', False)).lower() in ('1', 'true', 'yes')
+    q.setdefault('solution', '')
+    q.setdefault('options', None)
+    return q
+
+def validate(record):
+    """Return (question, None) or (None, error message) for one record"""
+    try:
+        q = normalize(record)
+    except (KeyError, TypeError, ValueError) as e:
+        return None, f"malformed record: {e!r}"
+    if not q['subject']:
+        return None, "missing subject"
+    if q['subject'] not in SUBJECTS:
+        return None, f"unknown subject {q['subject']!r}"
+    if q['type'] not in QUESTION_TYPES:
+        return None, f"unknown type {q['type']!r}"
+    if not str(q.get('question') or '').strip():
+        return None, "empty question text"
+    if q['type'] == 'mcq':
+        if not q['options'] or len(q['options']) < 2:
+            return None, "mcq needs at least two options"
+        if not 0 <= q['correct'] < len(q['options']):
+            return None, f"correct option {q['correct']} out of range"
+    else:
+        if q['options']:
+            return None, f"{q['type']} question should not have options"
+        if q['type'] == 'numerical' and not 0 <= q['correct'] <= 9:
+            return None, f"numerical answer {q['correct']} outside 0-9"
+    return q, None
+
+def validate_chunk(records):
+    """Validate (source location, record) pairs in a worker"""
+    return [(where, *validate(record)) for where, record in records]
+
+def blueprint_gaps(sections, pool, blueprint=DEFAULT_BLUEPRINT):
+    """Blueprint sections the bank does not fit, as (subject, types, have, need);
+    sections counts questions by (subject, type)"""
+    gaps = []
+    for subject, types, need in blueprint:
+        have = sum(sections[subject, t] for t in types)
+        if have < need or (not pool and have != need):
+            gaps.append((subject, types, have, need))
+    return gaps
+
+class ShardWriter:
+    """Write JSON bank shards of at most shard_size questions each"""
+
+    def __init__(self, prefix, shard_size):
+        self.prefix = prefix
+        self.shard_size = shard_size
+        self.files = []
+        self._f = None
+        self._count = 0
+
+    def add(self, question):
+        if self._f is None or self._count == self.shard_size:
+            self._close_shard()
+            name = f"{self.prefix}_{len(self.files) + 1:03d}.json"
+            self.files.append(name)
+            self._f = open(name, 'w', encoding='utf-8')
+            self._f.write('[\n')
+            self._count = 0
+        self._f.write((',\n' if self._count else '') + json.dumps(question, ensure_ascii=False))
+        self._count += 1
+
+    def _close_shard(self):
+        if self._f is not None:
+            self._f.write('\n]\n')
+            self._f.close()
+            self._f = None
+
+    def close(self):
+        self._close_shard()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream, validate and write a question bank")
+    parser.add_argument('sources', nargs='+')
+    parser.add_argument('--out', required=True, help="output path (.qbank) or shard prefix")
+    parser.add_argument('--format', choices=('qbank', 'shards'), default='qbank')
+    parser.add_argument('--shard-size', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--chunk', type=int, default=500, help="records per worker task")
+    parser.add_argument('--errors', help="write rejected records to this JSONL file")
+    args = parser.parse_args(argv)
+
+    if args.format == 'qbank':
+        out = args.out if args.out.endswith('.qbank') else args.out + '.qbank'
+        writer = BankWriter(out)
+    else:
+        writer = ShardWriter(args.out, args.shard_size)
+    errors_file = open(args.errors, 'w', encoding='utf-8') if args.errors else None
+
+    def records():
+        for source in args.sources:
+            for number, record in enumerate(read_source(source), 1):
+                yield f"{source}:{number}", record
+
+    seen_ids, subjects, types, sections = set(), Counter(), Counter(), Counter()
+    written = rejected = 0
+    started = time.perf_counter()
+    with Pool(args.workers) as pool:
+        for results in pool.imap(validate_chunk, chunked(records(), args.chunk)):
+            for where, q, error in results:
+                if q is not None and q['id'] in seen_ids:
+                    q, error = None, f"duplicate id {q['id']}"
+                if q is None:
+                    rejected += 1
+                    if errors_file:
+                        errors_file.write(json.dumps({'source': where, 'error': error}) + '\n')
+                    elif rejected <= 20:
+                        print(f"❌ {where}: {error}", file=sys.stderr)
+                    continue
+                seen_ids.add(q['id'])
+                subjects[q['subject']] += 1
+                types[q['type']] += 1
+                sections[q['subject'], q['type']] += 1
+                writer.add(q)
+                written += 1
+    writer.close()
+    if errors_file:
+        errors_file.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ Wrote {written} questions ({rejected} rejected) in {elapsed:.2f}s "
+          f"({(written + rejected) / elapsed if elapsed else 0:.0f} records/s)")
+    print("   Subjects: " + ", ".join(f"{s} {n}" for s, n in subjects.most_common()))
+    print("   Types: " + ", ".join(f"{t} {n}" for t, n in types.most_common()))
+    if args.format == 'shards':
+        print(f"   Shards: {', '.join(writer.files)}")
+
+    pool = os.path.basename(args.out).startswith('pool_')
+    gaps = blueprint_gaps(sections, pool)
+    for subject, section_types, have, need in gaps:
+        print(f"⚠️  {subject} {'/'.join(section_types)}: {have} questions, the paper blueprint "
+              f"{'draws' if pool else 'has'} {need}", file=sys.stderr)
+    if gaps and not pool and written > sum(need for _, _, need in DEFAULT_BLUEPRINT):
+        print("   ℹ️  name the output pool_* to draw papers from a bank this large", file=sys.stderr)
+    return 1 if rejected or gaps else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""
+Bulk re-scoring of submitted answer sheets
+Usage: python bulk_score.py questions.json sheets.jsonl [--out scores.csv] [--chunk 4096]
+
+Sheets are JSONL ({"student": ..., "answers": [2, null, 7, 3.25, ...]})
+or CSV (student, then one column per question, blank = unattempted).
+"""
+
+import argparse
+import csv
+import json
+import sys
+import time
+
+from question_bank import get_bank
+
+def read_sheets(filename):
+    """Yield (student, answers) without loading the whole file"""
+    with open(filename, 'r', encoding='utf-8', newline='') as f:
+        if filename.endswith('.csv'):
+            reader = csv.reader(f)
+            next(reader, None)  # header
+            for row in reader:
+                if row:
+                    yield row[0], row[1:]
+        else:
+            for line in f:
+                if line.strip():
+                    sheet = json.loads(line)
+                    yield sheet['student'], sheet['answers']
+
+def iter_chunks(sheets, size, chunk):
+    import numpy as np
+
+    from grading import answers_to_row
+    students, rows = [], []
+    for student, answers in sheets:
+        students.append(student)
+        rows.append(answers_to_row(answers, size))
+        if len(rows) == chunk:
+            yield students, np.vstack(rows)
+            students, rows = [], []
+    if rows:
+        yield students, np.vstack(rows)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-score answer sheets against a question bank")
+    parser.add_argument('bank')
+    parser.add_argument('sheets')
+    parser.add_argument('--out', help="CSV output (default: stdout)")
+    parser.add_argument('--chunk', type=int, default=4096, help="sheets scored per vectorized pass")
+    args = parser.parse_args(argv)
+    from grading import get_answer_key  # numpy; not needed for --help
+
+    key = get_answer_key(get_bank(args.bank))
+    out = open(args.out, 'w', encoding='utf-8', newline='') if args.out else sys.stdout
+    writer = csv.writer(out)
+    writer.writerow(['student', 'total', 'correct', 'incorrect', 'unattempted']
+                    + [f"{s.lower()}_score" for s in key.subjects])
+
+    started, count = time.perf_counter(), 0
+    for students, matrix in iter_chunks(read_sheets(args.sheets), key.size, args.chunk):
+        scores = key.score(matrix)
+        for j, student in enumerate(students):
+            writer.writerow([student, scores['total'][j], scores['correct'][j], scores['incorrect'][j],
+                             scores['unattempted'][j]] + scores['subject_score'][j].tolist())
+        count += len(students)
+    if args.out:
+        out.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ Scored {count} sheets in {elapsed:.2f}s ({count / elapsed if elapsed else 0:.0f}/s)", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,439 @@
+"""
+Incremental cohort analytics for JEE Exam Simulator
+Usage: python cohort_analytics.py questions_test1.json [--backend sqlite:///attempts.db] [--csv items.csv]
+
+Running aggregates per test: how often each question was served, attempted and
+answered correctly, correct counts per total-score bin (for the top/bottom
+quartile discrimination index) and score distributions overall and per subject.
+Each submitted attempt is folded in once in O(questions), graded by the same
+AnswerKey as the results page. Aggregates are checkpointed under .analytics/
+with the submission time they cover, so a report only reads newer attempts.
+numpy (and grading) load on first use, so importing this module or asking the
+command for --help stays quick.
+"""
+
+import argparse
+import csv
+import logging
+import os
+import sys
+import threading
+import time
+from array import array
+
+from jee_core import MARKING_SCHEME
+from question_bank import get_bank
+from question_pool import DEFAULT_BLUEPRINT, get_pool_index
+
+CHECKPOINT_DIR = os.environ.get('JEE_ANALYTICS_DIR', '.analytics')
+# Write-behind backends commit a submission a moment after stamping it; only
+# attempts older than this are folded in, so none is skipped past the watermark
+SETTLE_SECONDS = 5
+CHECKPOINT_EVERY = 30  # seconds between checkpoint writes while catching up
+CHUNK = 4096           # fixed-test sheets graded per vectorized pass
+PAPER_SIZE = sum(count for _, _, count in DEFAULT_BLUEPRINT)
+
+log = logging.getLogger(__name__)
+
+def score_range(paper_size=PAPER_SIZE, scheme=MARKING_SCHEME):
+    """Lowest and highest possible total, e.g. -75..300 for a 75-question paper"""
+    return (paper_size * min(minus for _, minus in scheme.values()),
+            paper_size * max(plus for plus, _ in scheme.values()))
+
+class ScoreHistogram:
+    """Counts of integer scores over a fixed range; scores outside it are clamped.
+    A Fenwick tree over the counts answers rank and percentile in O(log range)."""
+
+    def __init__(self, lo, hi, counts=None):
+        import numpy as np
+        self.lo, self.hi = lo, hi
+        self.counts = np.zeros(hi - lo + 1, dtype=np.int64) if counts is None else counts
+        self._tree = None  # built on the first lookup, then kept up to date by add()
+
+    def bin(self, score):
+        return min(max(int(score), self.lo), self.hi) - self.lo
+
+    def add(self, score):
+        b = self.bin(score)
+        self.counts[b] += 1
+        if self._tree is not None:
+            i = b + 1
+            while i < len(self._tree):
+                self._tree[i] += 1
+                i += i & -i
+
+    def add_many(self, scores):
+        import numpy as np
+        np.add.at(self.counts, np.clip(np.asarray(scores, dtype=np.int64), self.lo, self.hi) - self.lo, 1)
+        self._tree = None
+
+    def _build_tree(self):
+        tree = [0] + self.counts.tolist()
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def count_at_most(self, score):
+        """Attempts scoring at or below score"""
+        if self._tree is None:
+            self._build_tree()
+        i, total = self.bin(score) + 1, 0
+        while i:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def standing(self, score, counted=True):
+        """(rank, out of, percentile) for a score; counted=False adds the score itself first.
+        Percentile is the share of attempts at or below the score, as in NTA percentiles."""
+        extra = 0 if counted else 1
+        n = self.n + extra
+        at_most = self.count_at_most(score) + extra
+        return n - at_most + 1, n, 100 * at_most / n
+
+    @property
+    def n(self):
+        return int(self.counts.sum())
+
+    def mean(self):
+        import numpy as np
+        n = self.n
+        return float((np.arange(self.lo, self.hi + 1) * self.counts).sum() / n) if n else 0.0
+
+    def quantile(self, q):
+        """Smallest score with at least a q share of attempts at or below it"""
+        import numpy as np
+        n = self.n
+        if not n:
+            return None
+        return int(np.searchsorted(np.cumsum(self.counts), max(1, int(np.ceil(q * n))))) + self.lo
+
+class CohortStats:
+    """Aggregates for one test; columns are bank positions (pool positions for pools)"""
+
+    def __init__(self, size, subjects, lo=None, hi=None):
+        import numpy as np
+        if lo is None:
+            lo, hi = score_range()
+        self.size = size
+        self.subjects = tuple(subjects)
+        self.n = 0
+        self.served = np.zeros(size, dtype=np.int64)
+        self.attempted = np.zeros(size, dtype=np.int64)
+        self.correct = np.zeros(size, dtype=np.int64)
+        self.time_sum = np.zeros(size, dtype=np.float64)
+        self.timed = np.zeros(size, dtype=np.int64)
+        # (score bin x question): who got it right / was served it, at each total score
+        self.total = ScoreHistogram(lo, hi)
+        self.bin_correct = np.zeros((len(self.total.counts), size), dtype=np.int32)
+        self.bin_served = np.zeros((len(self.total.counts), size), dtype=np.int32)
+        self.subject = {s: ScoreHistogram(lo, hi) for s in self.subjects}
+
+    def add(self, key, answers, columns=None, times=None):
+        """Fold one graded sheet in; columns maps paper questions to bank positions"""
+        import numpy as np
+        right, wrong = key.outcomes(answers)
+        right, wrong = right[0], wrong[0]
+        marks = right * key.plus + wrong * key.minus
+        cols = np.arange(key.size) if columns is None else np.asarray(columns, dtype=np.intp)
+        total = marks.sum()
+        b = self.total.bin(total)
+        self.n += 1
+        self.served[cols] += 1
+        self.attempted[cols] += right | wrong
+        self.correct[cols] += right
+        self.bin_served[b, cols] += 1
+        self.bin_correct[b, cols] += right
+        self.total.add(total)
+        for subject, score in zip(key.subjects, marks @ key.onehot):
+            if subject in self.subject:
+                self.subject[subject].add(score)
+        if times is not None:
+            times = np.asarray(times, dtype=np.float64)
+            self.time_sum[cols] += times
+            self.timed[cols] += times > 0
+
+    def add_many(self, key, answers, times=None):
+        """Fold in a (N, Q) block of fixed-test sheets in one vectorized pass"""
+        import numpy as np
+        right, wrong = key.outcomes(answers)
+        marks = right * key.plus + wrong * key.minus
+        totals = marks.sum(axis=1)
+        bins = np.clip(totals, self.total.lo, self.total.hi) - self.total.lo
+        self.n += len(totals)
+        self.served += len(totals)
+        self.attempted += (right | wrong).sum(axis=0)
+        self.correct += right.sum(axis=0)
+        np.add.at(self.bin_served, bins, 1)
+        np.add.at(self.bin_correct, bins, right.astype(np.int32))
+        self.total.add_many(totals)
+        subject_scores = marks @ key.onehot
+        for j, subject in enumerate(key.subjects):
+            if subject in self.subject:
+                self.subject[subject].add_many(subject_scores[:, j])
+        if times is not None:
+            self.time_sum += times.sum(axis=0)
+            self.timed += (times > 0).sum(axis=0)
+
+    def discrimination(self):
+        """Top-quartile minus bottom-quartile share correct per question (NaN if unserved)"""
+        import numpy as np
+        low, high = self.total.quantile(0.25), self.total.quantile(0.75)
+        if low is None:
+            return np.full(self.size, np.nan)
+        low_bins, high_bins = low - self.total.lo + 1, high - self.total.lo
+        with np.errstate(invalid='ignore', divide='ignore'):
+            bottom = self.bin_correct[:low_bins].sum(axis=0) / self.bin_served[:low_bins].sum(axis=0)
+            top = self.bin_correct[high_bins:].sum(axis=0) / self.bin_served[high_bins:].sum(axis=0)
+        return top - bottom
+
+    def item_stats(self):
+        """Per-question arrays: served, pct_correct, pct_attempted, avg_time, discrimination"""
+        import numpy as np
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return {
+                'served': self.served,
+                'pct_correct': 100 * self.correct / self.served,
+                'pct_attempted': 100 * self.attempted / self.served,
+                'avg_time': self.time_sum / self.timed,
+                'discrimination': self.discrimination(),
+            }
+
+    def subject_summary(self):
+        """Mean and quartiles of each subject's score, plus the total"""
+        rows = {}
+        for name, h in [('Total', self.total)] + list(self.subject.items()):
+            rows[name] = {'mean': round(h.mean(), 2), 'p25': h.quantile(0.25),
+                          'median': h.quantile(0.5), 'p75': h.quantile(0.75)}
+        return rows
+
+    ARRAYS = ('served', 'attempted', 'correct', 'time_sum', 'timed', 'bin_correct', 'bin_served')
+
+    def to_arrays(self):
+        arrays = {name: getattr(self, name) for name in self.ARRAYS}
+        arrays['total'] = self.total.counts
+        for i, s in enumerate(self.subjects):
+            arrays[f"subject_{i}"] = self.subject[s].counts
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, subjects, lo, hi, arrays):
+        stats = cls(len(arrays['served']), subjects, lo, hi)
+        for name in cls.ARRAYS:
+            setattr(stats, name, arrays[name])
+        stats.total.counts = arrays['total']
+        for i, s in enumerate(stats.subjects):
+            stats.subject[s].counts = arrays[f"subject_{i}"]
+        stats.n = stats.total.n
+        return stats
+
+def checkpoint_path(test_file, directory=CHECKPOINT_DIR):
+    return os.path.join(directory, os.path.basename(test_file) + '.npz')
+
+class CohortAnalytics:
+    """Aggregates for one test, caught up from a state backend on demand"""
+
+    def __init__(self, test_file, checkpoint_dir=CHECKPOINT_DIR):
+        from grading import get_answer_key
+
+        self.test_file = test_file
+        self.checkpoint_dir = checkpoint_dir
+        self.bank = get_bank(test_file)
+        self.source = self.bank.version
+        self.key = get_answer_key(self.bank)
+        self.watermark = 0.0  # every attempt submitted at or before this is counted
+        self._lock = threading.Lock()
+        self._saved_at = 0.0
+        self._refreshed_at = None  # time.monotonic() of the last refresh()
+        self.stats = self._load() or CohortStats(len(self.bank), self.key.subjects)
+
+    def _load(self):
+        import numpy as np
+        try:
+            with np.load(checkpoint_path(self.test_file, self.checkpoint_dir)) as data:
+                if str(data['source']) != self.source:
+                    return None  # the bank changed since; rebuild from the attempts
+                lo, hi = (int(x) for x in data['range'])
+                self.watermark = float(data['watermark'])
+                return CohortStats.from_arrays(self.key.subjects, lo, hi, {k: data[k] for k in data.files})
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def save(self):
+        import numpy as np
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        path = checkpoint_path(self.test_file, self.checkpoint_dir)
+        tmp = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp, source=np.array(self.source), watermark=self.watermark,
+                 range=np.array([self.stats.total.lo, self.stats.total.hi]), **self.stats.to_arrays())
+        os.replace(tmp, path)
+        self._saved_at = time.time()
+
+    def standing(self, submitted_at, total, subject_scores):
+        """{'Total' or subject: (rank, out of, percentile)} for one graded attempt.
+        An attempt not folded in yet (still inside the settle window) is counted in on the fly.
+        Holds the lock so a catch-up cannot reset the histograms' trees mid-lookup."""
+        with self._lock:
+            counted = submitted_at is not None and submitted_at <= self.watermark
+            standings = {'Total': self.stats.total.standing(total, counted)}
+            for subject, score in subject_scores.items():
+                if subject in self.stats.subject:
+                    standings[subject] = self.stats.subject[subject].standing(score, counted)
+            return standings
+
+    def _paper_columns(self, snapshot):
+        """Bank positions of a pool attempt's paper, or None for a fixed test"""
+        import numpy as np
+        if not snapshot.get('paper'):
+            return None
+        index = get_pool_index(self.bank)
+        try:
+            return np.array([index.by_id[i] for i in array('q', snapshot['paper'])], dtype=np.intp)
+        except KeyError:
+            return ()  # the pool lost a question from this paper; skip the attempt
+
+    def catch_up(self, backend, now=None):
+        """Fold in attempts submitted since the watermark; returns how many were added"""
+        import numpy as np
+        until = (now or time.time()) - SETTLE_SECONDS
+        with self._lock:
+            if until <= self.watermark:
+                return 0
+            added, block, block_times = 0, [], []
+            for snapshot in backend.iter_attempts(self.test_file, submitted_after=self.watermark,
+                                                  submitted_until=until):
+                answers = np.frombuffer(snapshot['answers'], dtype=np.float64)
+                times = snapshot.get('times')
+                times = np.frombuffer(times, dtype=np.float32) if times else np.zeros(len(answers), dtype=np.float32)
+                if len(times) != len(answers):
+                    times = np.zeros(len(answers), dtype=np.float32)
+                columns = self._paper_columns(snapshot)
+                if columns is None and len(answers) == self.key.size:
+                    block.append(answers)
+                    block_times.append(times)
+                    if len(block) == CHUNK:
+                        self.stats.add_many(self.key, np.vstack(block), np.vstack(block_times))
+                        block, block_times = [], []
+                elif columns is not None and len(columns) == len(answers):
+                    self.stats.add(self.key.take(columns), answers, columns, times)
+                else:
+                    continue
+                added += 1
+            if block:
+                self.stats.add_many(self.key, np.vstack(block), np.vstack(block_times))
+            self.watermark = until
+            if added and time.time() - self._saved_at > CHECKPOINT_EVERY:
+                self.save()
+            return added
+
+    def refresh(self, backend):
+        """catch_up() at most once per SETTLE_SECONDS, for callers that run on every
+        rerun; an attempt submitted in between is still ranked by standing()"""
+        now = time.monotonic()
+        with self._lock:
+            if self._refreshed_at is not None and now - self._refreshed_at < SETTLE_SECONDS:
+                return 0
+            self._refreshed_at = now
+        return self.catch_up(backend)
+
+_lock = threading.Lock()
+_engines = {}   # test file -> CohortAnalytics
+_rebuilds = {}  # test file -> thread building aggregates for a new bank version
+
+def _rebuild(test_file, backend):
+    """Build and catch up aggregates for the current bank, then swap them in"""
+    try:
+        engine = CohortAnalytics(test_file)
+        engine.refresh(backend)
+        with _lock:
+            _engines[test_file] = engine
+    except Exception:
+        log.exception("rebuilding cohort analytics for %s failed", test_file)
+    finally:
+        with _lock:
+            _rebuilds.pop(test_file, None)
+
+def get_analytics(test_file, backend=None):
+    """Process-wide aggregates for a test. Once its bank changes, the old aggregates
+    keep being served while a background thread re-reads the attempts from backend
+    for the new version (re-grading every attempt would stall the caller's rerun);
+    without a backend they are rebuilt on the spot."""
+    with _lock:
+        engine = _engines.get(test_file)
+        if engine is not None and engine.bank is not get_bank(test_file):
+            if backend is None:
+                engine = None
+            elif test_file not in _rebuilds:
+                _rebuilds[test_file] = thread = threading.Thread(
+                    target=_rebuild, args=(test_file, backend), name='analytics-rebuild', daemon=True)
+                thread.start()
+        if engine is None:
+            engine = _engines[test_file] = CohortAnalytics(test_file)
+        return engine
+
+def item_rows(engine):
+    """One report row per question served at least once"""
+    import numpy as np
+    stats = engine.stats.item_stats()
+    rows = []
+    for i in np.flatnonzero(stats['served']):
+        q = engine.bank[i]
+        rows.append({
+            'question': int(i) + 1, 'id': q['id'], 'subject': q['subject'], 'type': q['type'],
+            'served': int(stats['served'][i]),
+            'pct_correct': round(float(stats['pct_correct'][i]), 1),
+            'pct_attempted': round(float(stats['pct_attempted'][i]), 1),
+            'avg_time_s': None if np.isnan(stats['avg_time'][i]) else round(float(stats['avg_time'][i]), 1),
+            'discrimination': None if np.isnan(stats['discrimination'][i]) else round(float(stats['discrimination'][i]), 2),
+        })
+    return rows
+
+def main(argv=None):
+    from state_backend import DEFAULT_BACKEND, open_backend
+
+    parser = argparse.ArgumentParser(description="Item statistics and score distributions for one test")
+    parser.add_argument('test_file')
+    parser.add_argument('--backend', default=os.environ.get('JEE_STATE_BACKEND', DEFAULT_BACKEND))
+    parser.add_argument('--csv', help="write the per-question table to this file")
+    parser.add_argument('--top', type=int, default=10, help="hardest/least discriminating questions to list")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    engine = CohortAnalytics(args.test_file)
+    backend = open_backend(args.backend)
+    try:
+        added = engine.catch_up(backend)
+    finally:
+        backend.close()
+    if added:
+        engine.save()
+    elapsed = time.perf_counter() - started
+    print(f"📈 {args.test_file}: {engine.stats.n} attempts ({added} new) in {elapsed:.2f}s")
+    if not engine.stats.n:
+        return 0
+
+    print(f"\n{'':<12}{'mean':>8}{'p25':>6}{'median':>8}{'p75':>6}")
+    for name, row in engine.stats.subject_summary().items():
+        print(f"{name:<12}{row['mean']:>8}{row['p25']:>6}{row['median']:>8}{row['p75']:>6}")
+
+    rows = item_rows(engine)
+    print(f"\nHardest {args.top} questions (% correct):")
+    for r in sorted(rows, key=lambda r: r['pct_correct'])[:args.top]:
+        print(f"   Q{r['question']:<4} {r['subject']:<12} {r['pct_correct']:>5}% correct, {r['pct_attempted']:>5}% attempted")
+    rated = [r for r in rows if r['discrimination'] is not None]
+    print(f"\nLeast discriminating {args.top} (top minus bottom quartile):")
+    for r in sorted(rated, key=lambda r: r['discrimination'])[:args.top]:
+        print(f"   Q{r['question']:<4} {r['subject']:<12} D = {r['discrimination']:+.2f}")
+
+    if args.csv:
+        with open(args.csv, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"\n✅ Wrote {len(rows)} rows to {args.csv}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
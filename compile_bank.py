@@ -0,0 +1,89 @@
+"""
+Compile question JSON files into the binary .qbank format
+Run this after editing a question bank so the app can load questions lazily
+"""
+
+import argparse
+import json
+import os
+
+import latex_cache
+from question_bank import BANK_MAGIC, BANK_VERSION, HEADER, TABLE_ENTRY, compiled_path, iter_bank_file
+from test_catalog import find_test_files
+
+class BankWriter:
+    """Write a compiled bank one question at a time"""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._tmp = filename + '.tmp'
+        self._f = open(self._tmp, 'wb')
+        self._f.write(b'\0' * HEADER.size)
+        self._table = []
+
+    def add(self, question):
+        record = {k: v for k, v in question.items() if k != 'solution'}
+        q_bytes = json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        s_bytes = (question.get('solution') or '').encode('utf-8')
+        q_off = self._f.tell()
+        self._f.write(q_bytes)
+        s_off = self._f.tell()
+        self._f.write(s_bytes)
+        self._table.append((q_off, len(q_bytes), s_off, len(s_bytes)))
+
+    def close(self):
+        table_offset = self._f.tell()
+        for entry in self._table:
+            self._f.write(TABLE_ENTRY.pack(*entry))
+        self._f.seek(0)
+        self._f.write(HEADER.pack(BANK_MAGIC, BANK_VERSION, 0, len(self._table), table_offset))
+        self._f.close()
+        os.replace(self._tmp, self.filename)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._f.close()
+            os.remove(self._tmp)
+
+def compile_bank(source, target=None):
+    """Compile one JSON or JSONL bank; returns the output path and the parsed questions"""
+    target = target or compiled_path(source)
+    questions = list(iter_bank_file(source))
+    with BankWriter(target) as writer:
+        for q in questions:
+            writer.add(q)
+    return target, questions
+
+def prerender_latex(questions):
+    """Fill the LaTeX cache; skipped with a note if latex2mathml isn't installed"""
+    try:
+        import latex2mathml  # noqa: F401
+    except ImportError:
+        print("   ℹ️  pip install latex2mathml to pre-render LaTeX (the browser will typeset it instead)")
+        return
+    rendered, skipped, failed = latex_cache.build_cache(questions)
+    print(f"   LaTeX: {rendered} rendered, {skipped} unchanged, {failed} left for the browser")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile question JSON files into .qbank files")
+    parser.add_argument('sources', nargs='*', help="default: every test and pool bank here")
+    args = parser.parse_args(argv)
+    conflicts = []
+    sources = args.sources or [str(p) for p in find_test_files('.', conflicts) if p.suffix != '.qbank']
+    for names in conflicts:
+        print(f"⚠️  Skipping {', '.join(names)}: they would all compile to {compiled_path(names[0])}")
+    if not sources:
+        print("❌ No question files found")
+        return
+    for source in sources:
+        target, questions = compile_bank(source)
+        print(f"✅ {source} -> {target} ({os.path.getsize(source)} -> {os.path.getsize(target)} bytes)")
+        prerender_latex(questions)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Near-duplicate question index for JEE Exam Simulator
+Usage: python dedup_index.py [BANK ...] [--dir .] [--threshold 0.8] [--csv duplicates.csv]
+
+Finds the same question turning up in several banks with small wording or
+LaTeX differences. Question and option text is normalized (case, Unicode,
+LaTeX spacing and delimiters), cut into character 4-grams and summarized by a
+128-value MinHash signature. Locality-sensitive hashing over bands of the
+signature only compares questions that share a band, so a search over tens of
+thousands of questions is roughly linear. Signatures are stored per bank under
+.dedup/ with the bank version, so only new or changed banks are hashed again.
+"""
+
+import argparse
+import csv
+import functools
+import os
+import re
+import sys
+import time
+import unicodedata
+from pathlib import Path
+
+from question_bank import get_bank
+from test_catalog import find_test_files
+
+INDEX_DIR = os.environ.get('JEE_DEDUP_DIR', '.dedup')
+NUM_PERM = 128
+BANDS, ROWS = 16, 8  # BANDS * ROWS == NUM_PERM; pairs above ~0.7 similarity share a band
+SHINGLE = 4          # bytes per shingle, packed into one uint32
+SEED = 20240601
+SCHEME = f"minhash-ms-{NUM_PERM}-{SHINGLE}-{SEED}"  # stored signatures from another scheme are rebuilt
+
+# Commands that only change spacing or size, and spellings of the same symbol
+LATEX_NOISE = re.compile(r'\\(?:left|right|displaystyle|textstyle|quad|qquad|[,;:! ])|\\(?:math)?rm\b|\\text\b')
+LATEX_ALIASES = ((r'\dfrac', r'\frac'), (r'\tfrac', r'\frac'), (r'\times', '*'), (r'\cdot', '*'),
+                 (r'\le ', r'\leq '), (r'\ge ', r'\geq '), (r'\rightarrow', r'\to'))
+NON_WORD = re.compile(r'[^\w+\-*/=^<>.]+')
+
+def normalize_text(question):
+    """Question and option text reduced to what survives rewording-free edits"""
+    parts = [question.get('question') or ''] + [str(o) for o in question.get('options') or ()]
+    text = unicodedata.normalize('NFKC', ' '.join(parts)).lower()
+    text = LATEX_NOISE.sub(' ', text)
+    for alias, canonical in LATEX_ALIASES:
+        text = text.replace(alias, canonical)
+    text = text.replace('\\', ' ').replace('$', ' ')
+    return NON_WORD.sub(' ', text).strip()
+
+def shingles(text):
+    """Distinct 4-byte windows of the UTF-8 text, as uint32"""
+    import numpy as np
+    data = np.frombuffer(text.encode('utf-8').ljust(SHINGLE), dtype=np.uint8).astype(np.uint32)
+    packed = data[:len(data) - SHINGLE + 1].copy()
+    for i in range(1, SHINGLE):
+        packed = (packed << 8) | data[i:len(data) - SHINGLE + 1 + i]
+    return np.unique(packed)
+
+@functools.lru_cache(maxsize=None)
+def hash_params():
+    """Multiply-add-shift hashing of 32-bit keys: the high half of a * x + b (mod 2**64), a odd.
+    Drawn on first use so that numpy is only imported by a run that hashes."""
+    import numpy as np
+    rng = np.random.default_rng(SEED)
+    a = rng.integers(0, 1 << 63, NUM_PERM, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    b = rng.integers(0, 1 << 63, NUM_PERM, dtype=np.uint64)
+    return a, b, np.uint64(32)
+
+def signature(text):
+    """MinHash signature: the minimum of NUM_PERM universal hashes over the shingles"""
+    import numpy as np
+    a, b, shift = hash_params()
+    h = shingles(text).astype(np.uint64)[:, None] * a  # (shingles, NUM_PERM), in place from here
+    h += b
+    h >>= shift
+    return h.min(axis=0).astype(np.uint32)
+
+def index_path(bank_file, directory=INDEX_DIR):
+    return os.path.join(directory, os.path.basename(bank_file) + '.npz')
+
+class BankSignatures:
+    """Signatures of one bank version; loaded from the index or computed and stored"""
+
+    def __init__(self, bank_file, directory=INDEX_DIR):
+        import numpy as np
+        self.file = bank_file
+        self.questions = get_bank(bank_file)
+        self.version = self.questions.version
+        self.cached = self._load(directory)
+        if not self.cached:
+            self.ids = np.array([q['id'] for q in self.questions], dtype=np.int64)
+            self.signatures = (np.vstack([signature(normalize_text(q)) for q in self.questions])
+                               if len(self.questions) else np.zeros((0, NUM_PERM), dtype=np.uint32))
+            self._save(directory)
+
+    def _load(self, directory):
+        import numpy as np
+        try:
+            with np.load(index_path(self.file, directory)) as data:
+                if (str(data['source']) != os.path.abspath(self.file) or str(data['version']) != self.version
+                        or str(data['scheme']) != SCHEME):
+                    return False
+                self.ids, self.signatures = data['ids'], data['signatures']
+                return True
+        except (OSError, KeyError, ValueError):
+            return False
+
+    def _save(self, directory):
+        import numpy as np
+        os.makedirs(directory, exist_ok=True)
+        path = index_path(self.file, directory)
+        tmp = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp, source=os.path.abspath(self.file), version=self.version, scheme=SCHEME,
+                 ids=self.ids, signatures=self.signatures)
+        os.replace(tmp, path)
+
+def candidate_pairs(signatures):
+    """Row pairs that agree on every row of at least one band"""
+    import numpy as np
+    pairs = set()
+    for band in range(BANDS):
+        keys = np.ascontiguousarray(signatures[:, band * ROWS:(band + 1) * ROWS]).view(f'V{4 * ROWS}').ravel()
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        ends = np.r_[starts[1:], len(keys)]
+        for start, end in zip(starts[ends - starts > 1], ends[ends - starts > 1]):
+            members = order[start:end].tolist()
+            for i, a in enumerate(members):
+                for b in members[i + 1:]:
+                    pairs.add((a, b) if a < b else (b, a))
+    return pairs
+
+def find_duplicates(signatures, threshold=0.8):
+    """Groups of rows whose estimated Jaccard similarity is at least threshold;
+    returns [(rows, [(row, other, similarity), ...]), ...], largest groups first"""
+    import numpy as np
+    edges = []
+    if not len(signatures):
+        return []
+    # Identical signatures join their first copy directly, so exact repeats never
+    # make a crowded LSH bucket (and a quadratic number of pairs)
+    unique, first, inverse = np.unique(signatures, axis=0, return_index=True, return_inverse=True)
+    inverse = inverse.ravel()
+    for row in np.flatnonzero(first[inverse] != np.arange(len(signatures))):
+        edges.append((int(first[inverse[row]]), int(row), 1.0))
+    pairs = np.array(sorted(candidate_pairs(unique)), dtype=np.int64).reshape(-1, 2)
+    similarity = (unique[pairs[:, 0]] == unique[pairs[:, 1]]).mean(axis=1)
+    for (a, b), s in zip(first[pairs[similarity >= threshold]], similarity[similarity >= threshold]):
+        edges.append((int(a), int(b), float(s)))
+
+    parent = list(range(len(signatures)))
+
+    def root(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for a, b, _ in edges:
+        parent[root(a)] = root(b)
+    groups = {}
+    for a, b, s in edges:
+        rows, group_edges = groups.setdefault(root(a), (set(), []))
+        rows.update((a, b))
+        group_edges.append((a, b, s))
+    return sorted(((sorted(rows), e) for rows, e in groups.values()), key=lambda g: (-len(g[0]), g[0]))
+
+def build_index(bank_files, directory=INDEX_DIR):
+    """Signatures of every bank -> (list of BankSignatures, stacked signatures, (bank, position) per row)"""
+    import numpy as np
+    banks = [BankSignatures(f, directory) for f in bank_files]
+    rows = [(bank, pos) for bank in banks for pos in range(len(bank.ids))]
+    stacked = (np.vstack([bank.signatures for bank in banks])
+               if banks else np.zeros((0, NUM_PERM), dtype=np.uint32))
+    return banks, stacked, rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find near-duplicate questions across banks")
+    parser.add_argument('banks', nargs='*', help="bank files (default: every test and pool in --dir)")
+    parser.add_argument('--dir', default='.')
+    parser.add_argument('--threshold', type=float, default=0.8, help="minimum estimated Jaccard similarity")
+    parser.add_argument('--csv', help="write one row per duplicate question to this file")
+    args = parser.parse_args(argv)
+
+    conflicts = []
+    files = args.banks or [str(p) for p in find_test_files(args.dir, conflicts)]
+    for names in conflicts:
+        print(f"⚠️  Skipping {', '.join(names)}: the same bank in several formats", file=sys.stderr)
+    started = time.perf_counter()
+    banks, signatures, rows = build_index(files)
+    indexed = time.perf_counter()
+    groups = find_duplicates(signatures, args.threshold)
+    searched = time.perf_counter()
+
+    hashed = [b for b in banks if not b.cached]
+    print(f"🔎 {len(rows)} questions in {len(banks)} banks; hashed {sum(len(b.ids) for b in hashed)} "
+          f"from {len(hashed)} new or changed banks in {indexed - started:.2f}s, searched in {searched - indexed:.2f}s")
+    print(f"🔁 {len(groups)} groups of near-duplicates (similarity ≥ {args.threshold})")
+
+    report = []
+    for n, (members, edges) in enumerate(groups, 1):
+        best = {}
+        for a, b, similarity in edges:
+            best[a] = max(best.get(a, 0), similarity)
+            best[b] = max(best.get(b, 0), similarity)
+        for row in members:
+            bank, pos = rows[row]
+            q = bank.questions[pos]
+            report.append({'group': n, 'file': bank.file, 'id': int(bank.ids[pos]), 'question': pos + 1,
+                           'subject': q.get('subject'), 'similarity': round(best[row], 3),
+                           'text': ' '.join(str(q.get('question', '')).split())[:80]})
+    for r in report[:50]:
+        print(f"   #{r['group']:<4} {Path(r['file']).name}:{r['id']:<8} {r['similarity']:.2f}  {r['text']}")
+    if len(report) > 50:
+        print(f"   … {len(report) - 50} more")
+
+    if args.csv and report:
+        with open(args.csv, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(report[0]))
+            writer.writeheader()
+            writer.writerows(report)
+        print(f"\n✅ Wrote {len(report)} rows to {args.csv}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
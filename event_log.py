@@ -0,0 +1,84 @@
+"""
+Navigation event log for JEE Exam Simulator
+Each session records what the student did (visit, save, mark, clear, submit)
+into a fixed-size typed buffer stamped with time.monotonic(). The buffer is
+handed to the state backend as one packed batch when it fills up and on submit,
+with timestamps converted to wall-clock time so batches from different workers
+line up. Time spent per question is derived from the batches afterwards.
+"""
+
+import struct
+import time
+from array import array
+
+VISIT, SAVE, MARK, CLEAR, SUBMIT = range(5)
+EVENT_NAMES = ('visit', 'save', 'mark', 'clear', 'submit')
+BATCH_HEADER = struct.Struct('<I')  # number of events; then times (d), kinds (B), questions (H)
+CAPACITY = 512
+
+class EventLog:
+    """Preallocated per-session buffer; record() is a few array stores"""
+
+    __slots__ = ('times', 'kinds', 'questions', 'size')
+
+    def __init__(self, capacity=CAPACITY):
+        self.times = array('d', bytes(8 * capacity))
+        self.kinds = array('B', bytes(capacity))
+        self.questions = array('H', bytes(2 * capacity))
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def record(self, kind, question):
+        """Append one event; returns True once the buffer is full and should be drained"""
+        i = self.size
+        self.times[i] = time.monotonic()
+        self.kinds[i] = kind
+        self.questions[i] = question
+        self.size = i + 1
+        return self.size == len(self.kinds)
+
+    def drain(self):
+        """Packed batch of everything buffered (None if empty); the buffer starts over"""
+        n = self.size
+        if not n:
+            return None
+        offset = time.time() - time.monotonic()
+        times = array('d', (t + offset for t in self.times[:n]))
+        self.size = 0
+        return BATCH_HEADER.pack(n) + times.tobytes() + self.kinds[:n].tobytes() + self.questions[:n].tobytes()
+
+def decode_batch(blob):
+    """Packed batch -> (wall-clock times, kinds, questions)"""
+    (n,) = BATCH_HEADER.unpack_from(blob, 0)
+    offset = BATCH_HEADER.size
+    times, kinds, questions = array('d'), array('B'), array('H')
+    times.frombytes(blob[offset:offset + 8 * n])
+    offset += 8 * n
+    kinds.frombytes(blob[offset:offset + n])
+    offset += n
+    questions.frombytes(blob[offset:offset + 2 * n])
+    return times, kinds, questions
+
+def question_timeline(batches, size):
+    """Seconds spent on and visits to each question, from an attempt's batches.
+    Time runs from a visit until the next visit or the submission."""
+    events = []
+    for blob in batches:
+        events.extend(zip(*decode_batch(blob)))
+    events.sort(key=lambda e: e[0])
+    seconds, visits = array('d', bytes(8 * size)), array('I', bytes(4 * size))
+    current = since = None
+    for t, kind, q in events:
+        if kind not in (VISIT, SUBMIT):
+            continue
+        if current is not None and current < size:
+            seconds[current] += t - since
+        if kind == SUBMIT:
+            current = None
+            continue
+        if q < size and q != current:
+            visits[q] += 1
+        current, since = q, t
+    return seconds, visits
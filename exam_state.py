@@ -0,0 +1,129 @@
+"""
+Compact per-session exam state for JEE Exam Simulator
+Answers live in a typed array, status in small integer codes, review marks in a bitset
+"""
+
+import math
+import sys
+import time
+from array import array
+
+NOT_VISITED, NOT_ANSWERED, ANSWERED = 0, 1, 2
+STATUS_NAMES = ('not-visited', 'not-answered', 'answered')
+EXAM_DURATION = 3 * 60 * 60
+
+class ExamState:
+    """Answer sheet for one attempt; `questions` is the shared bank, never copied"""
+
+    __slots__ = ('questions', 'current', 'answers', 'status', 'review', 'deadline', 'time_spent')
+
+    def __init__(self, questions):
+        n = len(questions)
+        self.questions = questions
+        self.current = 0
+        self.answers = array('d', [math.nan]) * n  # NaN = unanswered
+        self.status = bytearray(n)                  # NOT_VISITED / NOT_ANSWERED / ANSWERED
+        self.review = bytearray((n + 7) // 8)       # one bit per question
+        self.deadline = None                        # wall-clock epoch seconds once started
+        self.time_spent = None                      # array('f') seconds per question, set on submit
+
+    def __len__(self):
+        return len(self.answers)
+
+    # Deadline; every change after it is rejected
+    def start(self, duration=EXAM_DURATION, now=None):
+        self.deadline = (time.time() if now is None else now) + duration
+
+    @property
+    def started(self):
+        return self.deadline is not None
+
+    def time_remaining(self, now=None):
+        if self.deadline is None:
+            return EXAM_DURATION
+        return max(0, int(self.deadline - (time.time() if now is None else now)))
+
+    def expired(self, now=None):
+        return self.deadline is not None and (time.time() if now is None else now) >= self.deadline
+
+    # Answers
+    def get_answer(self, index):
+        value = self.answers[index]
+        if math.isnan(value):
+            return None
+        if self.questions[index]['type'] == 'decimal':
+            return value
+        return int(value)
+
+    def set_answer(self, index, value):
+        if self.expired():
+            return False
+        self.answers[index] = math.nan if value is None else float(value)
+        return True
+
+    def has_answer(self, index):
+        return not math.isnan(self.answers[index])
+
+    # Review bitset
+    def is_marked(self, index):
+        return bool(self.review[index >> 3] & (1 << (index & 7)))
+
+    def set_marked(self, index, marked):
+        if marked:
+            self.review[index >> 3] |= 1 << (index & 7)
+        else:
+            self.review[index >> 3] &= ~(1 << (index & 7)) & 0xFF
+
+    # Status
+    def status_name(self, index):
+        return STATUS_NAMES[self.status[index]]
+
+    def count_status(self, code):
+        return self.status.count(code)
+
+    # Navigation
+    def navigate(self, index):
+        if self.expired():
+            return
+        self.current = index
+        if self.status[index] == NOT_VISITED:
+            self.status[index] = NOT_ANSWERED
+
+    def save(self):
+        if self.expired():
+            return
+        if self.has_answer(self.current):
+            self.status[self.current] = ANSWERED
+            self.set_marked(self.current, False)
+
+    def clear(self):
+        if self.set_answer(self.current, None):
+            self.status[self.current] = NOT_ANSWERED
+
+    def mark(self):
+        if self.expired():
+            return
+        self.set_marked(self.current, True)
+
+    @classmethod
+    def from_snapshot(cls, questions, snapshot):
+        """Rebuild state saved by attempt_store; None if the bank no longer matches"""
+        exam = cls(questions)
+        answers = array('d')
+        answers.frombytes(snapshot['answers'])
+        if len(answers) != len(exam) or len(snapshot['status']) != len(exam):
+            return None
+        exam.answers = answers
+        exam.status = bytearray(snapshot['status'])
+        exam.review = bytearray(snapshot['review'])
+        exam.current = snapshot['current']
+        exam.deadline = snapshot['deadline']
+        if snapshot.get('times'):
+            exam.time_spent = array('f')
+            exam.time_spent.frombytes(snapshot['times'])
+        return exam
+
+    def nbytes(self):
+        """Bytes held by this session's state, excluding the shared bank"""
+        return (sys.getsizeof(self) + sys.getsizeof(self.current) + sys.getsizeof(self.answers)
+                + sys.getsizeof(self.status) + sys.getsizeof(self.review) + sys.getsizeof(self.deadline))
@@ -0,0 +1,259 @@
+"""
+Bulk export of per-student result reports
+Usage: python export_reports.py questions_test1.json [--backend sqlite:///attempts.db] [--out reports]
+                                [--workers N] [--chunk 32] [--limit N]
+
+Renders what the results page shows (score cards with percentile, subject-wise
+performance, time per question and every solution next to the student's
+answer) as a standalone HTML file for each submitted attempt of a test.
+Attempts are streamed from the state backend and rendered in a process pool.
+Each worker loads the bank and the cohort checkpoint once, and renders a
+question's text, options and solution (with LaTeX pre-rendered by
+latex_cache) only the first time a report needs it. Reports are written as
+they arrive, into a directory or, for an --out ending in .zip, one archive.
+Attempts are graded against the current version of the bank. Never imports
+streamlit.
+"""
+
+import argparse
+import os
+import sys
+import time
+import zipfile
+from array import array
+from datetime import datetime
+from itertools import islice
+from multiprocessing import Pool
+from pathlib import Path
+
+from cohort_analytics import CohortAnalytics
+from jee_core import (MARKING_SCHEME, SUBJECTS, chunked, format_time, score_attempt, get_bank, get_solution,
+                      get_pool_index, test_name, ExamState, Paper)
+from latex_cache import render_text
+
+PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title>
+<link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/katex@0.16.9/dist/katex.min.css">
+<script defer src="https://cdn.jsdelivr.net/npm/katex@0.16.9/dist/katex.min.js"></script>
+<script defer src="https://cdn.jsdelivr.net/npm/katex@0.16.9/dist/contrib/auto-render.min.js"
+  onload="renderMathInElement(document.body, {{delimiters: [{{left: '$$', right: '$$', display: true}}, {{left: '$', right: '$', display: false}}]}})"></script>
+<style>
+    body {{ font-family: sans-serif; color: #333333; max-width: 1100px; margin: 0 auto; padding: 20px; }}
+    .cards {{ display: flex; gap: 12px; }}
+    .card {{ flex: 1; padding: 20px; border-radius: 10px; text-align: center; color: white; }}
+    table {{ border-collapse: collapse; width: 100%; }}
+    th, td {{ border-bottom: 1px solid #dddddd; padding: 6px 10px; text-align: right; }}
+    th:first-child, td:first-child {{ text-align: left; }}
+    .question-card {{ background-color: #f8f9fa; border-left: 4px solid #667eea; padding: 20px; border-radius: 10px; margin-bottom: 20px; }}
+    .solution-box {{ background-color: #e8f4f8; padding: 15px; border-radius: 8px; border-left: 4px solid #2196F3; margin: 10px 0; }}
+    .option.correct {{ color: #2e7d32; font-weight: bold; }}
+    .option.wrong {{ color: #c62828; }}
+</style></head>
+<body>
+<h1>🎉 {title}</h1>
+<p>Attempt {attempt_id} · submitted {submitted}</p>
+<div class="cards">{cards}</div>
+<hr><h2>📊 Subject-wise Performance</h2>
+<table><tr><th>Subject</th><th>Score</th><th>Correct</th><th>Incorrect</th><th>Unattempted</th><th>Accuracy</th><th>Percentile</th></tr>
+{subjects}</table>
+{time_spent}
+<hr><h2>📝 Solutions</h2>
+{solutions}
+</body></html>
+"""
+CARD = "<div class='card' style='background:{bg};'><h3>{title}</h3><h1>{value}</h1><p>{subtitle}</p></div>"
+SUBJECT_ROW = ("<tr><td>{subject}</td><td>{score}/{max_score}</td><td>{correct}/{n}</td><td>{incorrect}/{n}</td>"
+               "<td>{unattempted}/{n}</td><td>{accuracy:.1f}%</td><td>{percentile}</td></tr>")
+TIME_SPENT = """<hr><h2>⏱️ Time per Question</h2>
+<table><tr><th>Question</th><th>Subject</th><th>Time</th><th>Result</th></tr>
+{rows}</table>"""
+TIME_ROW = "<tr><td>Q{number}</td><td>{subject}</td><td>{time}</td><td>{outcome}</td></tr>"
+SOLUTION = """<div class='question-card'>
+<p>{emoji} <b>Q{number}</b> ({subject}) - {marks} marks</p>
+<p><b>Question:</b> {question}</p>
+{options}<p><b>Your Answer:</b> {answer} · <b>Correct:</b> {correct}</p>
+<div class='solution-box'>💡 <b>Solution:</b> {solution}</div>
+</div>"""
+OPTION = "<div class='option{css}'>{mark}{letter}. {text}{note}</div>"
+
+_state = {}  # per worker: the bank, the cohort engine and rendered question fragments
+
+def init_worker(test_file):
+    """Load everything the reports of one test share, once per worker process"""
+    _state['name'] = test_name(Path(test_file))
+    _state['bank'] = get_bank(test_file)
+    _state['engine'] = CohortAnalytics(test_file)
+    _state['fragments'] = {}  # bank position -> (question, options, solution) markup
+
+def question_fragments(pool, position):
+    """Rendered text, options and solution of one bank question, built on first use"""
+    fragments = _state['fragments'].get(position)
+    if fragments is None:
+        q = pool[position]
+        fragments = _state['fragments'][position] = (
+            render_text(q['question']).replace('\n', '<br>'),
+            tuple(render_text(str(o)) for o in q.get('options') or ()),
+            render_text(get_solution(pool, position)).replace('\n', '<br>'),
+        )
+    return fragments
+
+def answer_text(q, answer):
+    if answer is None:
+        return "Not answered"
+    return chr(65 + answer) if q['type'] == 'mcq' else str(answer)
+
+def restore_exam(snapshot):
+    """ExamState of a stored attempt on the current bank, or None if it no longer fits"""
+    questions = _state['bank']
+    if snapshot.get('paper'):
+        try:
+            questions = Paper.from_ids(get_pool_index(questions), array('q', snapshot['paper']), snapshot['seed'])
+        except KeyError:
+            return None
+    return ExamState.from_snapshot(questions, snapshot)
+
+def render_report(snapshot):
+    """HTML report for one submitted attempt, or None if it can't be graded"""
+    from grading import CORRECT, UNATTEMPTED  # numpy, which --help does not need
+
+    exam = restore_exam(snapshot)
+    if exam is None:
+        return None
+    results = score_attempt(exam)
+    standings = _state['engine'].standing(snapshot['submitted_at'], results.total_score,
+                                          {s: stats['score'] for s, stats in results.subject_stats.items()})
+    plus = max(p for p, _ in MARKING_SCHEME.values())
+    n = len(exam)
+    rank, cohort, percentile = standings['Total']
+
+    cards = ''.join(CARD.format(title=title, value=value, subtitle=subtitle, bg=bg) for title, value, subtitle, bg in (
+        ("Total Score", f"{results.total_score}/{plus * n}", f"{results.total_score / (plus * n) * 100:.2f}%",
+         "linear-gradient(135deg, #667eea 0%, #764ba2 100%)"),
+        ("Percentile", f"{percentile:.2f}", f"Rank {rank:,} of {cohort:,}", "linear-gradient(135deg, #11998e 0%, #38ef7d 100%)"),
+        ("Correct", str(results.correct), f"{results.correct}/{n}", "#4caf50"),
+        ("Incorrect", str(results.incorrect), f"{results.incorrect}/{n}", "#f44336"),
+        ("Unattempted", str(results.unattempted), f"{results.unattempted}/{n}", "#ff9800"),
+    ))
+
+    subjects = []
+    for subject in SUBJECTS:
+        stats = results.subject_stats.get(subject)
+        if stats is None:
+            continue
+        count = stats['correct'] + stats['incorrect'] + stats['unattempted']
+        attempted = stats['correct'] + stats['incorrect']
+        subjects.append(SUBJECT_ROW.format(
+            subject=subject, score=stats['score'], max_score=plus * count, n=count, correct=stats['correct'],
+            incorrect=stats['incorrect'], unattempted=stats['unattempted'],
+            accuracy=stats['correct'] / attempted * 100 if attempted else 0,
+            percentile=f"{standings[subject][2]:.1f}" if subject in standings else "–"))
+
+    time_spent = ''
+    if exam.time_spent is not None and any(exam.time_spent):
+        slowest = sorted(range(n), key=lambda i: exam.time_spent[i], reverse=True)[:10]
+        time_spent = TIME_SPENT.format(rows='\n'.join(
+            TIME_ROW.format(number=i + 1, subject=results.records[i].subject, time=format_time(int(exam.time_spent[i])),
+                            outcome=results.records[i].outcome)
+            for i in slowest if exam.time_spent[i] > 0))
+
+    questions = exam.questions
+    pool = getattr(questions, 'pool', questions)
+    positions = getattr(questions, 'positions', None)
+    solutions = []
+    for record in results.records:
+        i = record.index
+        q = questions[i]
+        question, options, solution = question_fragments(pool, positions[i] if positions is not None else i)
+        answer = exam.get_answer(i)
+        option_rows = []
+        for idx, text in enumerate(options):
+            right, chosen = idx == q['correct'], answer == idx
+            option_rows.append(OPTION.format(
+                css=' correct' if right else ' wrong' if chosen else '', mark='✅ ' if right else '❌ ' if chosen else '',
+                letter=chr(65 + idx), text=text, note=' (Your Answer)' if chosen else ''))
+        solutions.append(SOLUTION.format(
+            emoji='🟠' if record.outcome == UNATTEMPTED else '🟢' if record.outcome == CORRECT else '🔴',
+            number=i + 1, subject=record.subject, marks=f"{'+' if record.marks > 0 else ''}{record.marks}",
+            question=question, options=''.join(option_rows), answer=answer_text(q, answer),
+            correct=chr(65 + q['correct']) if q['type'] == 'mcq' else q['correct'], solution=solution))
+
+    return PAGE.format(
+        title=f"{_state['name']} – Results", attempt_id=snapshot['attempt_id'],
+        submitted=datetime.fromtimestamp(snapshot['submitted_at']).strftime('%Y-%m-%d %H:%M'),
+        cards=cards, subjects='\n'.join(subjects), time_spent=time_spent, solutions='\n'.join(solutions))
+
+def render_chunk(snapshots):
+    """[(attempt id, encoded report or None)] for one task's worth of attempts"""
+    out = []
+    for snapshot in snapshots:
+        html = render_report(snapshot)
+        out.append((snapshot['attempt_id'], html.encode('utf-8') if html is not None else None))
+    return out
+
+class DirectoryOutput:
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def write(self, name, data):
+        with open(os.path.join(self.path, name), 'wb') as f:
+            f.write(data)
+
+    def close(self):
+        pass
+
+class ZipOutput:
+    def __init__(self, path):
+        self.path = path
+        self._zip = zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED)
+
+    def write(self, name, data):
+        self._zip.writestr(name, data)
+
+    def close(self):
+        self._zip.close()
+
+def main(argv=None):
+    from state_backend import DEFAULT_BACKEND, open_backend
+
+    parser = argparse.ArgumentParser(description="Write an HTML result report for every submitted attempt of a test")
+    parser.add_argument('test_file')
+    parser.add_argument('--backend', default=os.environ.get('JEE_STATE_BACKEND', DEFAULT_BACKEND))
+    parser.add_argument('--out', default='reports', help="output directory, or a .zip file")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--chunk', type=int, default=32, help="attempts per worker task")
+    parser.add_argument('--limit', type=int, help="stop after this many attempts")
+    args = parser.parse_args(argv)
+
+    backend = open_backend(args.backend)
+    # Bring the cohort checkpoint up to date so every worker ranks against the same cohort
+    engine = CohortAnalytics(args.test_file)
+    engine.catch_up(backend)
+    engine.save()
+
+    out = ZipOutput(args.out) if args.out.endswith('.zip') else DirectoryOutput(args.out)
+    written = skipped = 0
+    started = time.perf_counter()
+    try:
+        attempts = islice(backend.iter_attempts(args.test_file), args.limit)
+        with Pool(args.workers, initializer=init_worker, initargs=(args.test_file,)) as pool:
+            for batch in pool.imap(render_chunk, chunked(attempts, args.chunk)):
+                for attempt_id, html in batch:
+                    if html is None:
+                        skipped += 1
+                        continue
+                    out.write(f"{attempt_id}.html", html)
+                    written += 1
+    finally:
+        out.close()
+        backend.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ Wrote {written} reports to {args.out} in {elapsed:.2f}s "
+          f"({written / elapsed if elapsed else 0:.0f} reports/s, {args.workers} workers)")
+    if skipped:
+        print(f"⚠️  Skipped {skipped} attempts that no longer match {args.test_file}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,14 @@
 """
 Script to generate questions.json for JEE Exam Simulator
 Run this to create/update your question bank
+Usage: python generate_questions.py [--out questions.json | questions.jsonl.gz | questions.jsonl.zst]
 """
 
+import argparse
 import json
+import sys
+
+from question_bank import JSONL_SUFFIXES, write_jsonl
 
 def create_questions():
     questions = []
@@ -160,22 +165,31 @@ def create_questions():
     
     return questions
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the sample question bank")
+    parser.add_argument('--out', default='questions.json',
+                        help="a .jsonl, .jsonl.gz or .jsonl.zst name writes one question per line")
+    args = parser.parse_args(argv)
+
     print("=" * 60)
     print("JEE EXAM SIMULATOR - Question Bank Generator")
     print("=" * 60)
-    print("\nGenerating questions.json...")
+    print(f"\nGenerating {args.out}...")
     
     questions = create_questions()
     
-    with open('questions.json', 'w', encoding='utf-8') as f:
-        json.dump(questions, f, indent=2, ensure_ascii=False)
+    if args.out.endswith(JSONL_SUFFIXES):
+        write_jsonl(args.out, questions)
+    else:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(questions, f, indent=2, ensure_ascii=False)
     
-    print(f"✅ Successfully created questions.json with {len(questions)} questions")
+    print(f"✅ Successfully created {args.out} with {len(questions)} questions")
     print("\n📝 Note: This is a template with sample questions.")
-    print("   Please edit questions.json to add your complete question bank.")
+    print(f"   Please edit {args.out} to add your complete question bank.")
     print("   Use LaTeX formatting (e.g., $x^2$, $\\frac{1}{2}$) for math expressions")
     print("\n" + "=" * 60)
+    return 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
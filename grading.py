@@ -0,0 +1,119 @@
+"""
+Vectorized grading for JEE Exam Simulator
+Compiles a bank's answer key once, then scores any number of answer sheets in one pass
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from jee_core import SUBJECTS, MARKING_SCHEME, DECIMAL_TOLERANCE
+from question_bank import derived
+
+CORRECT, INCORRECT, UNATTEMPTED = 'correct', 'incorrect', 'unattempted'
+QuestionResult = namedtuple('QuestionResult', 'index subject outcome marks')
+
+class AnswerKey:
+    """Answer key, question types and marking scheme of one bank as arrays"""
+
+    def __init__(self, questions, scheme=MARKING_SCHEME):
+        subjects = list(SUBJECTS)
+        for q in questions:
+            if q['subject'] not in subjects:
+                subjects.append(q['subject'])
+        self.subjects = tuple(subjects)
+        self.size = len(questions)
+        self.subject = np.array([subjects.index(q['subject']) for q in questions], dtype=np.int16)
+        self.correct = np.array([float(q['correct']) for q in questions], dtype=np.float64)
+        self.is_decimal = np.array([q['type'] == 'decimal' for q in questions], dtype=bool)
+        self.known_type = np.array([q['type'] in scheme for q in questions], dtype=bool)
+        self.plus = np.array([scheme.get(q['type'], (0, 0))[0] for q in questions], dtype=np.int16)
+        self.minus = np.array([scheme.get(q['type'], (0, 0))[1] for q in questions], dtype=np.int16)
+        # (questions x subjects) one-hot, so per-subject totals are a single matmul
+        self.onehot = np.zeros((self.size, len(subjects)), dtype=np.int32)
+        self.onehot[np.arange(self.size), self.subject] = 1
+
+    def take(self, positions):
+        """Answer key of a paper drawn from this bank, by fancy-indexing rather than re-reading"""
+        positions = np.asarray(positions, dtype=np.intp)
+        key = object.__new__(AnswerKey)
+        key.subjects = self.subjects
+        key.size = len(positions)
+        for name in ('subject', 'correct', 'is_decimal', 'known_type', 'plus', 'minus', 'onehot'):
+            setattr(key, name, getattr(self, name)[positions])
+        return key
+
+    def outcomes(self, answers):
+        """(N, Q) answers with NaN for unattempted -> boolean right and wrong matrices"""
+        answers = np.atleast_2d(np.asarray(answers, dtype=np.float64))
+        attempted = ~np.isnan(answers)
+        with np.errstate(invalid='ignore'):
+            diff = np.abs(answers - self.correct)
+            right = np.where(self.is_decimal, diff < DECIMAL_TOLERANCE, diff == 0)
+        right &= attempted & self.known_type
+        return right, attempted & ~right
+
+    def marks(self, answers):
+        """Per-question marks for each sheet, shape (N, Q)"""
+        right, wrong = self.outcomes(answers)
+        return right * self.plus + wrong * self.minus
+
+    def score(self, answers):
+        """Score an (N, Q) answer matrix in one vectorized pass"""
+        right, wrong = self.outcomes(answers)
+        unattempted = ~(right | wrong)
+        marks = right * self.plus + wrong * self.minus
+        return {
+            'total': marks.sum(axis=1),
+            'correct': right.sum(axis=1),
+            'incorrect': wrong.sum(axis=1),
+            'unattempted': unattempted.sum(axis=1),
+            'subject_score': marks @ self.onehot,
+            'subject_correct': right.astype(np.int32) @ self.onehot,
+            'subject_incorrect': wrong.astype(np.int32) @ self.onehot,
+            'subject_unattempted': unattempted.astype(np.int32) @ self.onehot,
+        }
+
+def get_answer_key(questions):
+    """Compiled answer key for a shared bank, built once per bank version"""
+    pool = getattr(questions, 'pool', None)
+    if pool is not None:  # a question_pool.Paper: slice the pool's key
+        return get_answer_key(pool).take(questions.positions)
+    return derived(questions, 'answer_key', AnswerKey)
+
+def answers_to_row(answers, size):
+    """List of answers (None for unattempted) -> float row with NaN gaps"""
+    row = np.full(size, np.nan)
+    for i, a in enumerate(answers[:size]):
+        if a is not None and a != '':
+            row[i] = float(a)
+    return row
+
+class SheetResult:
+    """Graded answer sheet: one QuestionResult per question plus totals"""
+
+    __slots__ = ('records', 'total_score', 'correct', 'incorrect', 'unattempted', 'subject_stats')
+
+    def __init__(self, records, subjects=SUBJECTS):
+        self.records = records
+        self.subject_stats = {s: {'correct': 0, 'incorrect': 0, 'unattempted': 0, 'score': 0} for s in subjects}
+        for r in records:
+            stats = self.subject_stats.setdefault(r.subject, {'correct': 0, 'incorrect': 0, 'unattempted': 0, 'score': 0})
+            stats[r.outcome] += 1
+            stats['score'] += r.marks
+        self.total_score = sum(r.marks for r in records)
+        self.correct = sum(1 for r in records if r.outcome == CORRECT)
+        self.incorrect = sum(1 for r in records if r.outcome == INCORRECT)
+        self.unattempted = len(records) - self.correct - self.incorrect
+
+def grade_sheet(questions, answers):
+    """Grade one sheet (float answers, NaN = unattempted) into per-question records"""
+    key = get_answer_key(questions)
+    right, wrong = key.outcomes(answers)
+    right, wrong = right[0], wrong[0]
+    marks = right * key.plus + wrong * key.minus
+    records = tuple(
+        QuestionResult(i, key.subjects[key.subject[i]],
+                       CORRECT if right[i] else INCORRECT if wrong[i] else UNATTEMPTED, int(marks[i]))
+        for i in range(key.size))
+    return SheetResult(records, key.subjects)
@@ -0,0 +1,64 @@
+"""
+Streamlit-free core of JEE Exam Simulator
+One import for batch tools: the bank model, grading and exam-state logic
+without any UI. Importing this module is nearly free; the modules behind each
+name (and numpy, for grading) load the first time the name is used.
+"""
+
+import importlib
+from itertools import islice
+
+SUBJECTS = ('Physics', 'Chemistry', 'Mathematics')
+# (marks if correct, marks if incorrect) per question type; negative marking is Section A (MCQ) only
+MARKING_SCHEME = {'mcq': (4, -1), 'numerical': (4, 0), 'decimal': (4, 0)}
+DECIMAL_TOLERANCE = 0.01
+
+# name -> module it lives in
+_EXPORTS = {
+    'get_bank': 'question_bank', 'get_bank_version': 'question_bank', 'get_solution': 'question_bank',
+    'cache_stats': 'question_bank',
+    'CompiledBank': 'question_bank',
+    'ExamState': 'exam_state', 'ANSWERED': 'exam_state', 'NOT_ANSWERED': 'exam_state',
+    'NOT_VISITED': 'exam_state', 'EXAM_DURATION': 'exam_state',
+    'AnswerKey': 'grading', 'get_answer_key': 'grading', 'grade_sheet': 'grading',
+    'CORRECT': 'grading', 'INCORRECT': 'grading', 'UNATTEMPTED': 'grading',
+    'get_catalog': 'test_catalog', 'catalog_conflicts': 'test_catalog', 'test_name': 'test_catalog',
+    'Paper': 'question_pool', 'new_paper': 'question_pool', 'get_pool_index': 'question_pool',
+}
+
+__all__ = ['SUBJECTS', 'MARKING_SCHEME', 'DECIMAL_TOLERANCE', 'format_time', 'chunked', 'load_questions',
+           'score_attempt', *_EXPORTS]
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value  # later lookups skip __getattr__
+    return value
+
+def format_time(seconds):
+    """Seconds -> HH:MM:SS"""
+    h, m, s = seconds // 3600, (seconds % 3600) // 60, seconds % 60
+    return f"{h:02d}:{m:02d}:{s:02d}"
+
+def chunked(iterable, size):
+    """Lists of up to size items, for handing a stream to a process pool"""
+    it = iter(iterable)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+def load_questions(filename, version=None):
+    """Shared read-only bank for a question file; raises on a missing or malformed file.
+    With a version, that version (in memory or kept on disk), else the current one."""
+    from question_bank import get_bank, get_bank_version
+    return (version and get_bank_version(filename, version)) or get_bank(filename)
+
+def score_attempt(exam):
+    """Grade an ExamState into a grading.SheetResult"""
+    import numpy as np
+    from grading import grade_sheet
+    return grade_sheet(exam.questions, np.frombuffer(exam.answers, dtype=np.float64))
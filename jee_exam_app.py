@@ -4,10 +4,20 @@ Supports multiple mock tests without code changes!
 """
 
 import streamlit as st
-import json
+import numpy as np
 import time
-import os
+import string
+from array import array
 from pathlib import Path
+from jee_core import (format_time, load_questions as load_bank, score_attempt, get_solution, cache_stats,
+                      get_catalog, catalog_conflicts, test_name, ExamState, ANSWERED, NOT_ANSWERED, NOT_VISITED,
+                      CORRECT, INCORRECT, UNATTEMPTED, get_pool_index, new_paper, Paper)
+from state_backend import get_backend, new_attempt_id
+from latex_cache import render_text
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from cohort_analytics import get_analytics, item_rows
+from event_log import EventLog, question_timeline, VISIT, SAVE, MARK, CLEAR, SUBMIT
+import metrics
 
 # Page config
 st.set_page_config(
@@ -17,32 +27,20 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+def session_id():
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else None
+
+metrics.collector('bank_cache', lambda: {f"bank_cache_{k}": v for k, v in cache_stats().items()})
+
 # Get available tests
+@metrics.timed('get_available_tests')
 def get_available_tests():
-    """Find all question JSON files in the directory"""
-    tests = []
-    for file in Path('.').glob('questions_*.json'):
-        # Extract test name from filename
-        # questions_test1.json -> Test 1
-        # questions_fiitjee_2020.json -> FIITJEE 2020
-        test_name = file.stem.replace('questions_', '').replace('_', ' ').title()
-        tests.append({
-            'name': test_name,
-            'file': str(file),
-            'display': f"📝 {test_name}"
-        })
-    
-    # Also check for default questions.json
-    if Path('questions.json').exists():
-        tests.insert(0, {
-            'name': 'Default Test',
-            'file': 'questions.json',
-            'display': '📝 Default Test'
-        })
-    
-    return tests
+    """Indexed question files; the directory is only rescanned when it changes"""
+    return get_catalog('.')
 
 # Load CSS based on theme
+@metrics.timed('apply_theme')
 def apply_theme():
     if st.session_state.get('dark_mode', False):
         st.markdown("""
@@ -78,118 +76,193 @@ def init_session_state():
     if 'initialized' not in st.session_state:
         st.session_state.initialized = True
         st.session_state.current_test = None
-        st.session_state.current_question = 0
-        st.session_state.answers = []
-        st.session_state.question_status = []
-        st.session_state.marked_for_review = []
+        st.session_state.exam = None
+        st.session_state.results = None
         st.session_state.exam_started = False
         st.session_state.exam_submitted = False
-        st.session_state.start_time = None
-        st.session_state.time_remaining = 3 * 60 * 60
         st.session_state.dark_mode = False
-        st.session_state.questions = []
+        st.session_state.seen_ids = set()  # pool questions already served this session
 
 def reset_exam_state():
     """Reset state when switching tests"""
-    st.session_state.current_question = 0
-    st.session_state.answers = [None] * 75
-    st.session_state.question_status = ['not-visited'] * 75
-    st.session_state.marked_for_review = [False] * 75
+    st.session_state.exam = None
+    st.session_state.attempt_id = None
+    st.session_state.submitted_at = None
+    st.session_state.events = None
+    st.session_state.timeline = None
+    st.session_state.results = None
     st.session_state.exam_started = False
     st.session_state.exam_submitted = False
-    st.session_state.start_time = None
-    st.session_state.time_remaining = 3 * 60 * 60
-    st.session_state.questions = []
 
-def load_questions(filename):
-    """Load questions from a specific file"""
+@metrics.timed('load_questions')
+def load_questions(filename, version=None):
+    """Load questions from a specific file (shared, read-only, cached per process).
+    An attempt passes its bank version to keep the copy it started on."""
     try:
-        with open(filename, 'r', encoding='utf-8') as f:
-            questions = json.load(f)
+        questions = load_bank(filename, version)
         if not questions:
             st.error(f"❌ {filename} is empty!")
             return None
+        if version and questions.version != version:
+            st.info("ℹ️ This test was updated after the attempt started; it continues on the latest version.")
         return questions
     except Exception as e:
         st.error(f"❌ Error loading {filename}: {e}")
         return None
 
-# Helper functions (same as before)
-def format_time(seconds):
-    h, m, s = seconds // 3600, (seconds % 3600) // 60, seconds % 60
-    return f"{h:02d}:{m:02d}:{s:02d}"
+def load_paper(test):
+    """Questions for a new attempt: the test itself, or a fresh paper drawn from a pool"""
+    questions = load_questions(test['file'])
+    if not questions or not test.get('pool'):
+        return questions
+    seen = st.session_state.setdefault('seen_ids', set())
+    try:
+        paper = new_paper(questions, exclude_ids=seen)
+    except ValueError:
+        st.info("ℹ️ You have seen most of this pool; some questions may repeat.")
+        try:
+            paper = new_paper(questions)
+        except ValueError as e:
+            st.error(f"❌ {test['file']} can't fill a paper: {e}")
+            return None
+    seen.update(paper.ids)
+    return paper
 
-def get_palette_color(index):
-    if st.session_state.marked_for_review[index]: return "#9c27b0"
-    elif st.session_state.question_status[index] == 'answered': return "#4caf50"
-    elif st.session_state.question_status[index] == 'not-answered': return "#f44336"
-    else: return "#9e9e9e"
+def restore_paper(questions, snapshot):
+    """Rebuild the exact pool paper an attempt was drawn on"""
+    if not questions or not snapshot.get('paper'):
+        return questions
+    try:
+        return Paper.from_ids(get_pool_index(questions), array('q', snapshot['paper']), snapshot['seed'])
+    except KeyError:
+        return None  # the pool no longer has a question from this paper
 
+# Helper functions (same as before)
 def navigate_to_question(index):
-    st.session_state.current_question = index
-    if st.session_state.question_status[index] == 'not-visited':
-        st.session_state.question_status[index] = 'not-answered'
+    st.session_state.exam.navigate(index)
+    log_event(VISIT)
 
 def save_answer():
-    current = st.session_state.current_question
-    if st.session_state.answers[current] is not None:
-        st.session_state.question_status[current] = 'answered'
-        st.session_state.marked_for_review[current] = False
+    st.session_state.exam.save()
+    log_event(SAVE)
 
 def clear_answer():
-    current = st.session_state.current_question
-    st.session_state.answers[current] = None
-    st.session_state.question_status[current] = 'not-answered'
+    metrics.interaction('clear')
+    st.session_state.exam.clear()
+    log_event(CLEAR)
 
 def mark_for_review():
-    st.session_state.marked_for_review[st.session_state.current_question] = True
+    st.session_state.exam.mark()
+    log_event(MARK)
 
-def calculate_results(questions):
-    total_score, correct, incorrect, unattempted = 0, 0, 0, 0
-    subject_stats = {s: {'correct': 0, 'incorrect': 0, 'unattempted': 0, 'score': 0} 
-                    for s in ['Physics', 'Chemistry', 'Mathematics']}
-    
-    for i, q in enumerate(questions):
-        user_answer = st.session_state.answers[i]
-        subject = q['subject']
-        
-        if user_answer is None:
-            unattempted += 1
-            subject_stats[subject]['unattempted'] += 1
-        else:
-            is_correct = False
-            if q['type'] == 'mcq':
-                is_correct = user_answer == q['correct']
-            elif q['type'] == 'numerical':
-                is_correct = user_answer == q['correct']
-            elif q['type'] == 'decimal':
-                is_correct = abs(float(user_answer) - float(q['correct'])) < 0.01
-            
-            if is_correct:
-                correct += 1
-                subject_stats[subject]['correct'] += 1
-                total_score += 4
-                subject_stats[subject]['score'] += 4
-            else:
-                incorrect += 1
-                subject_stats[subject]['incorrect'] += 1
-                if i % 25 < 20:  # Negative marking only for Section A
-                    total_score -= 1
-                    subject_stats[subject]['score'] -= 1
-    
-    return total_score, correct, incorrect, unattempted, subject_stats
-
-def display_results(questions):
+# Navigation events are buffered per session and reach the backend a batch at a time
+def log_event(kind):
+    events = st.session_state.get('events')
+    if events is not None and events.record(kind, st.session_state.exam.current):
+        flush_events()
+
+def flush_events():
+    events = st.session_state.get('events')
+    batch = events.drain() if events is not None else None
+    if batch and st.session_state.get('attempt_id'):
+        get_backend().save_events(st.session_state.attempt_id, batch)
+
+def get_timeline(exam):
+    """(seconds, visits) per question, rebuilt from the stored events when not in the session"""
+    if st.session_state.get('timeline') is None:
+        st.session_state.timeline = question_timeline(
+            get_backend().load_events(st.session_state.attempt_id), len(exam))
+    return st.session_state.timeline
+
+def calculate_results(exam):
+    """Grade the attempt once; the result is memoized on the session at submission"""
+    if st.session_state.get('results') is None:
+        st.session_state.results = score_attempt(exam)
+    return st.session_state.results
+
+def submit_exam():
+    exam = st.session_state.exam
+    st.session_state.exam_submitted = True
+    calculate_results(exam)
+    log_event(SUBMIT)
+    flush_events()
+    st.session_state.timeline = None
+    exam.time_spent = array('f', get_timeline(exam)[0])
+    persist_exam(submitted=True)
+    # The deadline sweep may have submitted this attempt first; rank it by the time on record
+    st.session_state.submitted_at = get_backend().load(st.session_state.attempt_id)['submitted_at']
+
+# Attempt state lives in the state backend, so any worker can serve any attempt
+# (?attempt=<id> survives refreshes, restarts and reconnects to another worker)
+def begin_attempt(questions):
+    st.session_state.exam = ExamState(questions)
+    st.session_state.events = EventLog()
+    st.session_state.attempt_id = new_attempt_id()
+    st.query_params['attempt'] = st.session_state.attempt_id
+    persist_exam()
+
+@metrics.timed('persist_exam')
+def persist_exam(submitted=False):
+    """Hand a snapshot to the state backend and remember its revision"""
+    if st.session_state.get('attempt_id') and st.session_state.exam is not None:
+        st.session_state.revision = get_backend().save(
+            st.session_state.attempt_id, st.session_state.current_test['file'],
+            st.session_state.exam, submitted=submitted)
+
+@metrics.timed('sync_exam')
+def sync_exam():
+    """Reload the attempt if another worker saved a newer snapshot than ours"""
+    attempt_id = st.session_state.get('attempt_id')
+    if attempt_id and st.session_state.exam is not None:
+        revision = get_backend().revision(attempt_id)
+        if revision is not None and revision > st.session_state.get('revision', 0):
+            resume_attempt(attempt_id)
+
+def resume_attempt(attempt_id):
+    """Restore an attempt from the state backend; returns False if it can't be resumed"""
+    snapshot = get_backend().load(attempt_id)
+    if snapshot is None:
+        return False
+    questions = restore_paper(load_questions(snapshot['test_file'], snapshot['bank_version']), snapshot)
+    exam = ExamState.from_snapshot(questions, snapshot) if questions else None
+    if exam is None:
+        return False
+    test = next((t for t in get_available_tests() if t['file'] == snapshot['test_file']), None)
+    name = test['name'] if test else test_name(Path(snapshot['test_file']))
+    st.session_state.current_test = test or {'name': name, 'file': snapshot['test_file'], 'display': f"📝 {name}"}
+    continuing = st.session_state.get('attempt_id') == attempt_id and st.session_state.get('events') is not None
+    st.session_state.exam = exam
+    if not continuing:
+        st.session_state.events = EventLog()
+        st.session_state.timeline = None
+        if exam.started and snapshot['submitted_at'] is None:
+            log_event(VISIT)  # a new session picks up on the question the attempt was left on
+    st.session_state.attempt_id = attempt_id
+    st.session_state.exam_started = True
+    st.session_state.exam_submitted = snapshot['submitted_at'] is not None
+    st.session_state.submitted_at = snapshot['submitted_at']
+    st.session_state.revision = snapshot['updated_at']
+    if st.session_state.exam_submitted:
+        st.session_state.results = None
+    return True
+
+@metrics.timed('display_results')
+def display_results(exam):
     st.markdown("# 🎉 Test Completed!")
-    total_score, correct, incorrect, unattempted, subject_stats = calculate_results(questions)
+    results = calculate_results(exam)
+    total_score, correct, incorrect, unattempted = results.total_score, results.correct, results.incorrect, results.unattempted
+    subject_stats = results.subject_stats
+    standings = cohort_standing(results)
+    rank, cohort, percentile = standings['Total']
     
     # Score cards
-    col1, col2, col3, col4 = st.columns(4)
+    col1, col2, col3, col4, col5 = st.columns(5)
     cards = [
         (col1, "Total Score", f"{total_score}/300", f"{total_score/3:.2f}%", "linear-gradient(135deg, #667eea 0%, #764ba2 100%)"),
-        (col2, "Correct", str(correct), f"{correct}/75", "#4caf50"),
-        (col3, "Incorrect", str(incorrect), f"{incorrect}/75", "#f44336"),
-        (col4, "Unattempted", str(unattempted), f"{unattempted}/75", "#ff9800")
+        (col2, "Percentile", f"{percentile:.2f}", f"Rank {rank:,} of {cohort:,}", "linear-gradient(135deg, #11998e 0%, #38ef7d 100%)"),
+        (col3, "Correct", str(correct), f"{correct}/75", "#4caf50"),
+        (col4, "Incorrect", str(incorrect), f"{incorrect}/75", "#f44336"),
+        (col5, "Unattempted", str(unattempted), f"{unattempted}/75", "#ff9800")
     ]
     
     for col, title, value, subtitle, bg in cards:
@@ -207,55 +280,297 @@ def display_results(questions):
         acc = (stats['correct'] / (stats['correct'] + stats['incorrect']) * 100) if (stats['correct'] + stats['incorrect']) > 0 else 0
         
         with st.expander(f"{subject} - {stats['score']}/100 ({stats['score']}%)", expanded=True):
-            c1, c2, c3, c4, c5 = st.columns(5)
+            c1, c2, c3, c4, c5, c6 = st.columns(6)
             c1.metric("Score", f"{stats['score']}/100")
             c2.metric("Correct", f"{stats['correct']}/25")
             c3.metric("Incorrect", f"{stats['incorrect']}/25")
             c4.metric("Unattempted", f"{stats['unattempted']}/25")
             c5.metric("Accuracy", f"{acc:.1f}%")
+            if subject in standings:
+                c6.metric("Percentile", f"{standings[subject][2]:.1f}", help=f"Rank {standings[subject][0]:,} of {standings[subject][1]:,}")
+    
+    st.markdown("---")
+    display_time_spent(exam, results)
     
     st.markdown("---")
     st.markdown("## 📝 Solutions")
     
-    for i, q in enumerate(questions):
-        user_answer = st.session_state.answers[i]
-        
-        if user_answer is None:
-            emoji, marks = '🟠', 0
-        else:
-            is_correct = False
-            if q['type'] == 'mcq': is_correct = user_answer == q['correct']
-            elif q['type'] == 'numerical': is_correct = user_answer == q['correct']
-            elif q['type'] == 'decimal': is_correct = abs(float(user_answer) - float(q['correct'])) < 0.01
-            
-            emoji = '🟢' if is_correct else '🔴'
-            marks = 4 if is_correct else (-1 if i % 25 < 20 else 0)
-        
-        with st.expander(f"{emoji} Q{i+1} ({q['subject']}) - {'+' if marks > 0 else ''}{marks} marks"):
-            st.markdown(f"**Question:** {q['question']}")
-            
-            if q['type'] == 'mcq':
-                for idx, opt in enumerate(q['options']):
-                    if idx == q['correct']:
-                        st.success(f"✅ {chr(65+idx)}. {opt}")
-                    elif user_answer == idx:
-                        st.error(f"❌ {chr(65+idx)}. {opt} (Your Answer)")
-                    else:
-                        st.markdown(f"{chr(65+idx)}. {opt}")
-            
-            col1, col2 = st.columns(2)
-            with col1:
-                ans_text = f"{chr(65 + user_answer)}" if q['type'] == 'mcq' and user_answer is not None else str(user_answer) if user_answer is not None else "Not answered"
-                st.markdown(f"**Your Answer:** {ans_text}")
-            with col2:
-                correct_text = f"{chr(65 + q['correct'])}" if q['type'] == 'mcq' else str(q['correct'])
-                st.markdown(f"**Correct:** :green[{correct_text}]")
-            
-            st.markdown("---")
-            st.markdown(f"<div class='solution-box'>💡 **Solution:** {q['solution']}</div>", unsafe_allow_html=True)
+    display_solutions(exam, results)
     
     if st.button("🔄 Take Another Test", type="primary"):
         reset_exam_state()
+        st.query_params.pop('attempt', None)
+        reset_solutions_page()
+        st.rerun()
+
+def display_time_spent(exam, results):
+    st.markdown("## ⏱️ Time per Question")
+    seconds, visits = get_timeline(exam)
+    if not any(seconds):
+        st.info("No timing data was recorded for this attempt.")
+        return
+    spent = np.frombuffer(seconds, dtype=np.float64)
+    st.bar_chart({'question': np.arange(1, len(exam) + 1), 'seconds': spent.round(1)},
+                 x='question', y='seconds', height=220)
+    slowest = np.argsort(spent)[::-1][:10]
+    st.dataframe([{'Question': int(i) + 1, 'Subject': results.records[i].subject,
+                   'Time': format_time(int(spent[i])), 'Visits': visits[i],
+                   'Result': results.records[i].outcome} for i in slowest if spent[i] > 0],
+                 hide_index=True, width='stretch')
+
+def cohort_standing(results):
+    """Rank and percentile of this attempt in its test's cohort, overall and per subject"""
+    engine = get_analytics(st.session_state.current_test['file'], get_backend())
+    engine.refresh(get_backend())
+    return engine.standing(st.session_state.get('submitted_at'), results.total_score,
+                           {s: stats['score'] for s, stats in results.subject_stats.items()})
+
+@metrics.timed('display_analytics')
+def display_analytics(test):
+    """Cohort dashboard for one test, from running aggregates rather than a rescan"""
+    engine = get_analytics(test['file'], get_backend())
+    engine.refresh(get_backend())
+    stats = engine.stats
+    if not stats.n:
+        st.info("No submitted attempts yet.")
+        return
+    summary = stats.subject_summary()
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Attempts", stats.n)
+    c2.metric("Mean score", f"{summary['Total']['mean']:.1f}")
+    c3.metric("Median", summary['Total']['median'])
+    c4.metric("Middle 50%", f"{summary['Total']['p25']} – {summary['Total']['p75']}")
+    
+    counts = stats.total.counts
+    nonzero = np.flatnonzero(counts)
+    first, last = nonzero[0], nonzero[-1] + 1
+    st.bar_chart({'score': np.arange(first, last) + stats.total.lo, 'attempts': counts[first:last]},
+                 x='score', y='attempts', height=220)
+    st.dataframe([{'': name, **row} for name, row in summary.items()], hide_index=True)
+    
+    st.markdown("#### Questions")
+    st.caption("Discrimination = share correct in the top score quartile minus the bottom quartile")
+    st.dataframe(item_rows(engine), hide_index=True, width='stretch')
+
+SOLUTIONS_PER_PAGE = 10
+SOLUTION_FILTERS = {
+    'All': lambda r: True,
+    'Wrong only': lambda r: r.outcome == INCORRECT,
+    'Unattempted': lambda r: r.outcome == UNATTEMPTED,
+    'Correct': lambda r: r.outcome == CORRECT,
+}
+
+def reset_solutions_page():
+    st.session_state.solutions_page = 0
+    st.session_state.open_solution = None
+
+def display_solutions(exam, results):
+    """Filtered, paged solution list; a question's content is only sent once it is opened"""
+    f1, f2 = st.columns(2)
+    show = f1.radio("Show", list(SOLUTION_FILTERS), horizontal=True, key='solutions_filter', on_change=reset_solutions_page)
+    subject = f2.selectbox("Subject", ['All subjects'] + list(results.subject_stats), key='solutions_subject', on_change=reset_solutions_page)
+    
+    matches = [r for r in results.records
+               if SOLUTION_FILTERS[show](r) and (subject == 'All subjects' or r.subject == subject)]
+    if not matches:
+        st.info("No questions match these filters.")
+        return
+    
+    pages = (len(matches) + SOLUTIONS_PER_PAGE - 1) // SOLUTIONS_PER_PAGE
+    page = min(st.session_state.get('solutions_page', 0), pages - 1)
+    
+    for record in matches[page * SOLUTIONS_PER_PAGE:(page + 1) * SOLUTIONS_PER_PAGE]:
+        i, marks = record.index, record.marks
+        emoji = '🟠' if record.outcome == UNATTEMPTED else '🟢' if record.outcome == CORRECT else '🔴'
+        is_open = st.session_state.get('open_solution') == i
+        c1, c2 = st.columns([5, 1])
+        c1.markdown(f"{emoji} **Q{i+1}** ({record.subject}) - {'+' if marks > 0 else ''}{marks} marks")
+        if c2.button("Hide" if is_open else "View", key=f"sol_{i}"):
+            st.session_state.open_solution = None if is_open else i
+            st.rerun()
+        if is_open:
+            render_solution(exam, i)
+    
+    p1, p2, p3 = st.columns([1, 2, 1])
+    if p1.button("⬅️ Prev", disabled=page == 0, key='solutions_prev'):
+        st.session_state.solutions_page = page - 1
+        st.rerun()
+    p2.markdown(f"<div style='text-align:center'>Page {page + 1}/{pages} · {len(matches)} questions</div>", unsafe_allow_html=True)
+    if p3.button("Next ➡️", disabled=page >= pages - 1, key='solutions_next'):
+        st.session_state.solutions_page = page + 1
+        st.rerun()
+
+def render_solution(exam, i):
+    q = exam.questions[i]
+    user_answer = exam.get_answer(i)
+    with st.container(border=True):
+        st.markdown(f"**Question:** {render_text(q['question'])}", unsafe_allow_html=True)
+        
+        if q['type'] == 'mcq':
+            for idx, opt in enumerate(q['options']):
+                if idx == q['correct']:
+                    st.success(f"✅ {chr(65+idx)}. {opt}")
+                elif user_answer == idx:
+                    st.error(f"❌ {chr(65+idx)}. {opt} (Your Answer)")
+                else:
+                    st.markdown(f"{chr(65+idx)}. {opt}")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            ans_text = f"{chr(65 + user_answer)}" if q['type'] == 'mcq' and user_answer is not None else str(user_answer) if user_answer is not None else "Not answered"
+            st.markdown(f"**Your Answer:** {ans_text}")
+        with col2:
+            correct_text = f"{chr(65 + q['correct'])}" if q['type'] == 'mcq' else str(q['correct'])
+            st.markdown(f"**Correct:** :green[{correct_text}]")
+        
+        st.markdown("---")
+        st.markdown(f"<div class='solution-box'>💡 **Solution:** {render_text(get_solution(exam.questions, i))}</div>", unsafe_allow_html=True)
+
+TIMER_HTML = """
+<style>
+    body { margin: 0; font-family: sans-serif; }
+    .timer { font-size: 24px; font-weight: bold; padding: 10px 20px; border-radius: 8px; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; text-align: center; }
+    .timer.warning { background: #ff6b6b; animation: pulse 1s infinite; }
+    @keyframes pulse { 0%, 100% { opacity: 1; } 50% { opacity: 0.7; } }
+</style>
+<div id="timer" class="timer">$initial</div>
+<script>
+    // Count down locally from the server deadline, corrected for clock skew
+    const deadline = $deadline_ms + (Date.now() - $server_now_ms);
+    const el = document.getElementById("timer");
+    const pad = n => String(n).padStart(2, "0");
+    function tick() {
+        const s = Math.max(0, Math.round((deadline - Date.now()) / 1000));
+        el.textContent = pad(Math.floor(s / 3600)) + ":" + pad(Math.floor(s % 3600 / 60)) + ":" + pad(s % 60);
+        el.className = s <= 300 ? "timer warning" : "timer";
+        if (s > 0) setTimeout(tick, 1000 - (deadline - Date.now()) % 1000);
+    }
+    tick();
+</script>
+"""
+
+def exam_timer(exam):
+    """Countdown runs in the browser; deadline_watch, a fragment set to rerun just after
+    the deadline, submits the attempt. One whose tab is gone by then is submitted by
+    the backend's deadline sweep"""
+    st.iframe(string.Template(TIMER_HTML).substitute(
+        initial=format_time(exam.time_remaining()),
+        deadline_ms=int(exam.deadline * 1000),
+        server_now_ms=int(time.time() * 1000)), height=60)
+    
+    @st.fragment(run_every=exam.time_remaining() + 1)
+    @metrics.timed('deadline_watch', session=session_id)
+    def deadline_watch():
+        enforce_deadline(st.session_state.exam)
+    deadline_watch()
+
+def enforce_deadline(exam):
+    """Auto-submit once the deadline has passed; ExamState already rejects late answers"""
+    if exam.expired() and not st.session_state.exam_submitted:
+        submit_exam()
+        st.rerun()
+
+# Widget callbacks run before the fragment redraws, so no explicit st.rerun() is needed
+def go_to_question(index):
+    metrics.interaction('navigate')
+    save_answer()
+    navigate_to_question(index)
+
+def go_from_palette():
+    go_to_question(st.session_state.palette)
+    metrics.interaction('palette')
+
+def mark_and_next():
+    metrics.interaction('mark')
+    exam = st.session_state.exam
+    mark_for_review()
+    if exam.current < len(exam) - 1:
+        navigate_to_question(exam.current + 1)
+
+def save_and_next():
+    metrics.interaction('save')
+    exam = st.session_state.exam
+    save_answer()
+    if exam.current < len(exam) - 1:
+        navigate_to_question(exam.current + 1)
+
+PALETTE_SYMBOLS = {'marked': '🟣', ANSWERED: '🟢', NOT_ANSWERED: '🔴', NOT_VISITED: '⚫'}
+
+def palette_label(exam, index):
+    symbol = PALETTE_SYMBOLS['marked'] if exam.is_marked(index) else PALETTE_SYMBOLS[exam.status[index]]
+    return f"{symbol} {index + 1}"
+
+@st.fragment
+@metrics.timed('exam_body', session=session_id)
+def exam_body():
+    # Fragment reruns reuse the arguments of the last full run, so read the live state here
+    sync_exam()
+    if st.session_state.exam_submitted:
+        st.rerun()
+    exam = st.session_state.exam
+    enforce_deadline(exam)
+    col_q, col_p = st.columns([2, 1])
+    with col_q:
+        question_pane(exam)
+    with col_p:
+        palette(exam)
+
+@metrics.timed('question_card')
+def question_pane(exam):
+    current = exam.current
+    q = exam.questions[current]
+    total = len(exam)
+    
+    st.markdown(f"### :blue[{q['subject']} - Question {current + 1}/{total}]")
+    st.markdown(f"<div class='question-card'><b>Q{current + 1}:</b> {render_text(q['question'])}</div>", unsafe_allow_html=True)
+    
+    answer_input(exam, current)
+    
+    # Controls
+    st.markdown("---")
+    b1, b2, b3, b4 = st.columns(4)
+    b1.button("⬅️ Previous", disabled=current == 0, on_click=go_to_question, args=(current - 1,))
+    b2.button("🗑️ Clear", on_click=clear_answer)
+    b3.button("🔖 Mark", on_click=mark_and_next)
+    b4.button("💾 Save ➡️", type="primary", on_click=save_and_next)
+
+@st.fragment
+@metrics.timed('answer_input', session=session_id)
+def answer_input(exam, current):
+    """Picking an answer only redraws this input"""
+    q = exam.questions[current]
+    if q['type'] == 'mcq':
+        options = q['options']
+        selected = st.radio("Your answer:", range(len(options)),
+                          format_func=lambda x: f"{chr(65+x)}. {options[x]}",
+                          key=f"q_{current}",
+                          index=exam.get_answer(current))
+        if selected is not None:
+            exam.set_answer(current, selected)
+    elif q['type'] == 'numerical':
+        ans = st.number_input("Enter (0-9):", 0, 9, exam.get_answer(current) or 0, key=f"q_{current}")
+        exam.set_answer(current, ans)
+    else:
+        ans = st.number_input("Enter answer:", format="%.2f", value=float(exam.get_answer(current) or 0), key=f"q_{current}")
+        exam.set_answer(current, ans)
+    persist_exam()  # once per rerun: exam_body always redraws this fragment too
+
+@metrics.timed('palette')
+def palette(exam):
+    """All question buttons drawn as a single radio widget"""
+    st.markdown("### 🎯 Palette")
+    labels = [palette_label(exam, i) for i in range(len(exam))]
+    st.session_state.palette = exam.current
+    st.radio("Palette", range(len(exam)), format_func=labels.__getitem__, key='palette',
+             horizontal=True, label_visibility="collapsed", on_change=go_from_palette)
+    
+    st.markdown("---")
+    unanswered = len(exam) - exam.count_status(ANSWERED)
+    st.warning(f"⚠️ {unanswered} unanswered")
+    
+    if st.button("✅ Submit Test", type="primary", use_container_width=True):
+        metrics.interaction('submit')
+        submit_exam()
         st.rerun()
 
 # Main app
@@ -263,8 +578,17 @@ def main():
     init_session_state()
     apply_theme()
     
+    if st.session_state.exam is None and 'attempt' in st.query_params:
+        if not resume_attempt(st.query_params['attempt']):
+            st.query_params.pop('attempt', None)
+    else:
+        sync_exam()
+    
     # Get available tests
     available_tests = get_available_tests()
+    for names in catalog_conflicts():
+        st.warning(f"⚠️ {' and '.join(names)} are the same test in different formats; "
+                   "keep one of them to make it available.")
     
     if not available_tests:
         st.error("❌ No test files found!")
@@ -281,12 +605,19 @@ def main():
         for idx, test in enumerate(available_tests):
             with cols[idx % 3]:
                 if st.button(test['display'], use_container_width=True, type="primary"):
+                    metrics.interaction('open_test')
                     st.session_state.current_test = test
                     reset_exam_state()
-                    questions = load_questions(test['file'])
+                    questions = load_paper(test)
                     if questions:
-                        st.session_state.questions = questions
+                        begin_attempt(questions)
+                        st.session_state.exam_started = True
                         st.rerun()
+                counts = " · ".join(f"{subject} {n}" for subject, n in test['subjects'].items())
+                if test.get('pool'):
+                    st.caption(f"New paper each attempt from {test['total']} questions · {counts}")
+                else:
+                    st.caption(f"{test['total']} questions · {counts}")
         
         st.markdown("---")
         st.markdown("### 📋 Instructions")
@@ -298,6 +629,12 @@ def main():
         **Colors:** 🟢 Answered | 🔴 Not Answered | ⚫ Not Visited | 🟣 Marked
         """)
         
+        st.markdown("---")
+        if st.toggle("📈 Cohort analytics", key='show_analytics'):
+            choice = st.selectbox("Test", range(len(available_tests)), key='analytics_test',
+                                  format_func=lambda i: available_tests[i]['name'])
+            display_analytics(available_tests[min(choice, len(available_tests) - 1)])
+        
         # Dark mode toggle
         if st.button("🌙 Dark Mode" if not st.session_state.dark_mode else "☀️ Light Mode"):
             st.session_state.dark_mode = not st.session_state.dark_mode
@@ -306,15 +643,15 @@ def main():
         return
     
     # Load test if selected
-    if not st.session_state.questions and st.session_state.current_test:
-        questions = load_questions(st.session_state.current_test['file'])
+    if st.session_state.exam is None and st.session_state.current_test:
+        questions = load_paper(st.session_state.current_test)
         if not questions:
             st.error("Failed to load test")
             st.session_state.exam_started = False
             st.rerun()
-        st.session_state.questions = questions
+        st.session_state.exam = ExamState(questions)
     
-    questions = st.session_state.questions
+    exam = st.session_state.exam
     
     # Exam header
     col1, col2, col3 = st.columns([3, 1, 1])
@@ -326,113 +663,29 @@ def main():
             st.session_state.dark_mode = not st.session_state.dark_mode
             st.rerun()
     with col3:
-        if not st.session_state.exam_submitted:
-            elapsed = time.time() - st.session_state.start_time if st.session_state.start_time else 0
-            st.session_state.time_remaining = max(0, 3 * 60 * 60 - int(elapsed))
-            timer_class = "timer warning" if st.session_state.time_remaining <= 300 else "timer"
-            st.markdown(f'<div class="{timer_class}">{format_time(st.session_state.time_remaining)}</div>', unsafe_allow_html=True)
-            if st.session_state.time_remaining == 0:
-                st.session_state.exam_submitted = True
-                st.rerun()
+        if exam.started and not st.session_state.exam_submitted:
+            exam_timer(exam)
     
     st.markdown("---")
     
     # Start exam or show interface
-    if not st.session_state.start_time:
+    if not exam.started:
         if st.button("🚀 Start Exam", type="primary", use_container_width=True):
-            st.session_state.start_time = time.time()
+            metrics.interaction('start')
+            exam.start()
+            log_event(VISIT)
+            persist_exam()
             st.rerun()
         return
     
+    enforce_deadline(exam)
+    
     if st.session_state.exam_submitted:
-        display_results(questions)
+        display_results(exam)
         return
     
-    # Exam interface
-    col_q, col_p = st.columns([2, 1])
-    
-    with col_q:
-        current = st.session_state.current_question
-        q = questions[current]
-        
-        st.markdown(f"### :blue[{q['subject']} - Question {current + 1}/75]")
-        st.markdown(f"<div class='question-card'><b>Q{current + 1}:</b> {q['question']}</div>", unsafe_allow_html=True)
-        
-        # Answer input
-        if q['type'] == 'mcq':
-            selected = st.radio("Your answer:", range(len(q['options'])),
-                              format_func=lambda x: f"{chr(65+x)}. {q['options'][x]}",
-                              key=f"q_{current}",
-                              index=st.session_state.answers[current] if st.session_state.answers[current] is not None else None)
-            if selected is not None:
-                st.session_state.answers[current] = selected
-        elif q['type'] == 'numerical':
-            ans = st.number_input("Enter (0-9):", 0, 9, st.session_state.answers[current] or 0, key=f"q_{current}")
-            st.session_state.answers[current] = ans
-        else:
-            ans = st.number_input("Enter answer:", format="%.2f", value=float(st.session_state.answers[current] or 0), key=f"q_{current}")
-            st.session_state.answers[current] = ans
-        
-        # Controls
-        st.markdown("---")
-        b1, b2, b3, b4 = st.columns(4)
-        if b1.button("⬅️ Previous", disabled=current == 0):
-            save_answer()
-            navigate_to_question(current - 1)
-            st.rerun()
-        if b2.button("🗑️ Clear"):
-            clear_answer()
-            st.rerun()
-        if b3.button("🔖 Mark"):
-            mark_for_review()
-            if current < 74:
-                navigate_to_question(current + 1)
-            st.rerun()
-        if b4.button("💾 Save ➡️", type="primary"):
-            save_answer()
-            if current < 74:
-                navigate_to_question(current + 1)
-            st.rerun()
-    
-    with col_p:
-        st.markdown("### 🎯 Palette")
-        
-        # Physics
-        st.markdown("**Physics**")
-        cols = st.columns(5)
-        for i in range(25):
-            with cols[i % 5]:
-                if st.button(str(i + 1), key=f"p{i}"):
-                    save_answer()
-                    navigate_to_question(i)
-                    st.rerun()
-        
-        # Chemistry
-        st.markdown("**Chemistry**")
-        cols = st.columns(5)
-        for i in range(25, 50):
-            with cols[(i - 25) % 5]:
-                if st.button(str(i + 1), key=f"c{i}"):
-                    save_answer()
-                    navigate_to_question(i)
-                    st.rerun()
-        
-        # Math
-        st.markdown("**Math**")
-        cols = st.columns(5)
-        for i in range(50, 75):
-            with cols[(i - 50) % 5]:
-                if st.button(str(i + 1), key=f"m{i}"):
-                    save_answer()
-                    navigate_to_question(i)
-                    st.rerun()
-        
-        st.markdown("---")
-        unanswered = sum(1 for s in st.session_state.question_status if s != 'answered')
-        st.warning(f"⚠️ {unanswered} unanswered")
-        
-        if st.button("✅ Submit Test", type="primary", use_container_width=True):
-            st.session_state.exam_submitted = True
-            st.rerun()
+    # Exam interface: question pane and palette rerun as one fragment, the header does not
+    exam_body()
 
-main()
+with metrics.rerun(session_id()):
+    main()
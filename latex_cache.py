@@ -0,0 +1,103 @@
+"""
+Pre-rendered LaTeX for JEE Exam Simulator
+Each $...$ / $$...$$ fragment is rendered to MathML once at bank compile time and
+stored under .latex_cache/ by the hash of its source, so the app serves ready
+markup and unchanged fragments are never rendered twice.
+Rendering needs the optional latex2mathml package; lookups do not.
+"""
+
+import hashlib
+import os
+import re
+import threading
+
+CACHE_DIR = os.environ.get('JEE_LATEX_CACHE', '.latex_cache')
+TEXT_FIELDS = ('question', 'solution')
+# $$display$$ or $inline$, ignoring escaped \$
+FRAGMENT = re.compile(r'(?<!\\)\$\$(.+?)(?<!\\)\$\$|(?<!\\)\$(.+?)(?<!\\)\$', re.DOTALL)
+# Markdown would otherwise reinterpret these inside the markup
+MARKDOWN_ESCAPES = str.maketrans({'*': '&#42;', '_': '&#95;', '~': '&#126;', '`': '&#96;',
+                                  '$': '&#36;', '\\': '&#92;', '\n': ' '})
+
+def fragment_key(tex, display):
+    return hashlib.sha256(f"{'block' if display else 'inline'}:{tex}".encode('utf-8')).hexdigest()
+
+def fragment_path(key, cache_dir=CACHE_DIR):
+    return os.path.join(cache_dir, key[:2], key + '.html')
+
+def iter_fragments(text):
+    """Yield (match, tex, display) for every LaTeX fragment in a string"""
+    for m in FRAGMENT.finditer(text or ''):
+        display = m.group(1) is not None
+        yield m, (m.group(1) if display else m.group(2)).strip(), display
+
+def iter_texts(question):
+    for field in TEXT_FIELDS:
+        if question.get(field):
+            yield question[field]
+    for option in question.get('options') or ():
+        yield option
+
+def render_fragment(tex, display):
+    from latex2mathml.converter import convert
+    return convert(tex, display='block' if display else 'inline').translate(MARKDOWN_ESCAPES)
+
+def build_cache(questions, cache_dir=CACHE_DIR):
+    """Render every fragment not already cached; returns (rendered, skipped, failed)"""
+    rendered = skipped = failed = 0
+    seen = set()
+    for q in questions:
+        for text in iter_texts(q):
+            for _, tex, display in iter_fragments(text):
+                key = fragment_key(tex, display)
+                path = fragment_path(key, cache_dir)
+                if key in seen or os.path.exists(path):
+                    skipped += 1
+                    continue
+                seen.add(key)
+                try:
+                    markup = render_fragment(tex, display)
+                except Exception:
+                    failed += 1  # left as raw LaTeX for the browser to typeset
+                    continue
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    f.write(markup)
+                os.replace(tmp, path)
+                rendered += 1
+    return rendered, skipped, failed
+
+_lock = threading.Lock()
+_markup = {}  # key -> markup; misses aren't memoized so a later build is picked up
+MAX_MEMO = 50000
+
+def cached_markup(tex, display, cache_dir=CACHE_DIR):
+    key = fragment_key(tex, display)
+    with _lock:
+        if key in _markup:
+            return _markup[key]
+    try:
+        with open(fragment_path(key, cache_dir), 'r', encoding='utf-8') as f:
+            markup = f.read()
+    except OSError:
+        return None
+    with _lock:
+        if len(_markup) >= MAX_MEMO:
+            _markup.clear()
+        _markup[key] = markup
+    return markup
+
+def render_text(text, cache_dir=CACHE_DIR):
+    """Swap pre-rendered markup in for each cached fragment; the rest stays LaTeX"""
+    if not text or '$' not in text:
+        return text
+    parts, last = [], 0
+    for m, tex, display in iter_fragments(text):
+        markup = cached_markup(tex, display, cache_dir)
+        if markup is not None:
+            parts.append(text[last:m.start()])
+            parts.append(markup)
+            last = m.end()
+    parts.append(text[last:])
+    return ''.join(parts)
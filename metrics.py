@@ -0,0 +1,190 @@
+"""
+Per-rerun phase timing for JEE Exam Simulator
+Set JEE_METRICS to a file path to turn it on; every JEE_METRICS_INTERVAL seconds
+(default 15) a snapshot is written there, in Prometheus text format for *.prom
+(ready for node_exporter's textfile collector) or as JSON otherwise. A {pid}
+in the path gives each worker process its own file.
+With JEE_METRICS unset, phase() and rerun() return a shared no-op context
+manager, timed() leaves functions undecorated and nothing is recorded.
+"""
+
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+
+EXPORT_PATH = os.environ.get('JEE_METRICS', '').replace('{pid}', str(os.getpid()))
+ENABLED = bool(EXPORT_PATH)
+EXPORT_INTERVAL = float(os.environ.get('JEE_METRICS_INTERVAL', 15))
+BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+SESSION_IDLE = 300  # a session with no rerun for this long no longer counts as active
+
+class Histogram:
+    """Cumulative-bucket latency histogram, Prometheus style"""
+
+    __slots__ = ('counts', 'count', 'sum')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)  # last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, ms):
+        self.counts[bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.sum += ms
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation"""
+        target, seen = q * self.count, 0
+        for bound, n in zip(BUCKETS_MS + (float('inf'),), self.counts):
+            seen += n
+            if seen >= target and n:
+                return bound
+        return 0.0
+
+_lock = threading.Lock()
+_histograms = {}   # (phase, interaction) -> Histogram
+_sessions = {}     # session id -> last rerun time
+_collectors = {}   # name -> fn() -> {gauge name: value}
+_local = threading.local()
+NULL = nullcontext()
+
+def _record(phase, ms):
+    key = (phase, getattr(_local, 'interaction', None) or 'rerun')
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram()
+        histogram.observe(ms)
+
+class _Phase:
+    __slots__ = ('name', 'started')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, exc_type, exc, tb):
+        _record(self.name, (time.perf_counter() - self.started) * 1000)
+
+class _Rerun:
+    """Outermost scope of one script or fragment run; nested scopes are ignored"""
+
+    __slots__ = ('session', 'label', 'started', 'outermost')
+
+    def __init__(self, session, label=None):
+        self.session = session
+        self.label = label
+
+    def __enter__(self):
+        self.outermost = not getattr(_local, 'depth', 0)
+        _local.depth = getattr(_local, 'depth', 0) + 1
+        if self.outermost:
+            self.started = time.perf_counter()
+            if self.label and not getattr(_local, 'interaction', None):
+                _local.interaction = self.label
+            session = self.session() if callable(self.session) else self.session
+            if session is not None:
+                with _lock:
+                    _sessions[session] = time.time()
+
+    def __exit__(self, exc_type, exc, tb):
+        _local.depth -= 1
+        if self.outermost:
+            _record('rerun', (time.perf_counter() - self.started) * 1000)
+            _local.interaction = None
+
+def phase(name):
+    """Time a block as one phase of the current rerun"""
+    return _Phase(name) if ENABLED else NULL
+
+def rerun(session=None):
+    """Wrap a whole script (or fragment) run; labels reset when it ends"""
+    return _Rerun(session) if ENABLED else NULL
+
+def timed(name, session=None):
+    """Decorator form of phase(). With session (the session id, or a callable giving it)
+    the function is also a rerun scope, for fragments that rerun on their own."""
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with (_Rerun(session, name) if session is not None else NULL), _Phase(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def interaction(name):
+    """Label the rest of this rerun's phases with what triggered it (called from widget callbacks)"""
+    if ENABLED:
+        _local.interaction = name
+
+def collector(name, fn):
+    """Register (or replace) a function returning extra gauges for each snapshot"""
+    _collectors[name] = fn
+
+def snapshot():
+    """Everything recorded so far as a JSON-friendly dict"""
+    now = time.time()
+    with _lock:
+        for session, seen in list(_sessions.items()):
+            if now - seen > SESSION_IDLE:
+                del _sessions[session]
+        gauges = {'active_sessions': len(_sessions)}
+        phases = {}
+        for (name, label), h in sorted(_histograms.items()):
+            phases.setdefault(name, {})[label] = {
+                'count': h.count, 'sum_ms': round(h.sum, 3),
+                'p50_ms': h.quantile(0.5), 'p95_ms': h.quantile(0.95),
+                'buckets': dict(zip([str(b) for b in BUCKETS_MS] + ['+Inf'], h.counts)),
+            }
+    for fn in list(_collectors.values()):
+        gauges.update(fn())
+    return {'time': now, 'gauges': gauges, 'phases': phases}
+
+def prometheus_text(snap=None):
+    """Snapshot in the Prometheus text exposition format"""
+    snap = snap or snapshot()
+    lines = []
+    for name, value in snap['gauges'].items():
+        lines += [f"# TYPE jee_{name} gauge", f"jee_{name} {value}"]
+    lines.append("# TYPE jee_phase_duration_ms histogram")
+    for name, labels in snap['phases'].items():
+        for label, h in labels.items():
+            tags = f'phase="{name}",interaction="{label}"'
+            cumulative = 0
+            for bound, n in h['buckets'].items():
+                cumulative += n
+                lines.append(f'jee_phase_duration_ms_bucket{{{tags},le="{bound}"}} {cumulative}')
+            lines.append(f"jee_phase_duration_ms_sum{{{tags}}} {h['sum_ms']}")
+            lines.append(f"jee_phase_duration_ms_count{{{tags}}} {h['count']}")
+    return '\n'.join(lines) + '\n'
+
+def export(path=EXPORT_PATH):
+    """Write a snapshot to path atomically"""
+    snap = snapshot()
+    body = prometheus_text(snap) if path.endswith('.prom') else json.dumps(snap, indent=2)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(body)
+    os.replace(tmp, path)
+
+def _export_loop():
+    while True:
+        time.sleep(EXPORT_INTERVAL)
+        try:
+            export()
+        except OSError:
+            pass  # try again next interval
+
+if ENABLED:
+    threading.Thread(target=_export_loop, name='metrics-export', daemon=True).start()
+    atexit.register(export)
@@ -0,0 +1,432 @@
+"""
+Shared question bank registry for JEE Exam Simulator
+Keeps one parsed, read-only copy of each bank version per server process.
+A watcher thread loads new versions of changed files in the background; an
+attempt keeps the version it started on, and an old version is dropped once
+no attempt references it any more. Every version loaded is also copied under
+.bank_versions/, so an attempt resumed after a restart or on another worker
+still finds the version it started on.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import mmap
+import os
+import queue
+import shutil
+import struct
+import threading
+import time
+import weakref
+import zlib
+from collections.abc import Sequence
+from types import MappingProxyType
+
+WATCH_INTERVAL = float(os.environ.get('JEE_BANK_WATCH_INTERVAL', 2))  # seconds; 0 turns the watcher off
+SNAPSHOT_DIR = os.environ.get('JEE_BANK_SNAPSHOT_DIR', '.bank_versions')
+# A version's copy is kept this long after a newer version replaced it
+SNAPSHOT_DAYS = float(os.environ.get('JEE_BANK_SNAPSHOT_DAYS', 30))
+
+log = logging.getLogger(__name__)
+
+_lock = threading.Lock()       # guards the tables below; never held while parsing
+_load_lock = threading.Lock()  # one parse at a time, so a burst of sessions parses a file once
+_derived_lock = threading.Lock()
+_banks = {}  # abs path -> (file key, current version)
+_versions = weakref.WeakValueDictionary()  # (abs path, version) -> every version still referenced
+_failed = {}  # abs path -> file key that failed to load; retried once the file changes again
+_stats = {'hits': 0, 'misses': 0, 'reloads': 0, 'errors': 0}
+_watcher = None
+_hooks = []  # run on the watcher thread after each pass, e.g. the test catalog's check
+
+def bank_key(filename):
+    """Identify a bank file by path, mtime and size"""
+    st = os.stat(filename)
+    return (os.path.abspath(filename), st.st_mtime_ns, st.st_size)
+
+def freeze_question(question):
+    """Make a parsed question read-only (lists become tuples)"""
+    return MappingProxyType({k: tuple(v) if isinstance(v, list) else v
+                             for k, v in question.items()})
+
+# Compiled bank layout (see compile_bank.py):
+#   header  | magic, version, flags, count, table offset
+#   records | question JSON without solution, then solution text, per question
+#   table   | (question offset, length, solution offset, length) per question
+BANK_MAGIC = b'JEEQBANK'
+BANK_VERSION = 1
+HEADER = struct.Struct('<8sHHIQ8x')
+TABLE_ENTRY = struct.Struct('<QIQI')
+
+class FrozenBank(Sequence):
+    """Parsed JSON bank: a tuple of read-only questions that can carry its version
+    (and, unlike a bare tuple, be weakly referenced by the registry)"""
+
+    __slots__ = ('questions', 'version', 'derived', '__weakref__')
+
+    def __init__(self, questions):
+        self.questions = tuple(questions)
+
+    def __len__(self):
+        return len(self.questions)
+
+    def __getitem__(self, index):
+        return self.questions[index]
+
+    def __iter__(self):
+        return iter(self.questions)
+
+class CompiledBank(Sequence):
+    """Memory-mapped compiled bank; questions are decoded one at a time on access"""
+
+    def __init__(self, filename):
+        with open(filename, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _flags, count, table_offset = HEADER.unpack_from(self._map, 0)
+        if magic != BANK_MAGIC or version != BANK_VERSION:
+            raise ValueError(f"{filename} is not a version {BANK_VERSION} compiled bank")
+        self.filename = filename
+        self._count = count
+        self._table_offset = table_offset
+
+    def _entry(self, index):
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        return TABLE_ENTRY.unpack_from(self._map, self._table_offset + index * TABLE_ENTRY.size)
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        q_off, q_len, _, _ = self._entry(index)
+        return freeze_question(json.loads(self._map[q_off:q_off + q_len]))
+
+    def solution(self, index):
+        """Decode only the solution text for one question"""
+        _, _, s_off, s_len = self._entry(index)
+        return self._map[s_off:s_off + s_len].decode('utf-8')
+
+# Bank file suffixes, longest first; JSONL banks hold one question per line
+BANK_SUFFIXES = ('.jsonl.gz', '.jsonl.zst', '.jsonl', '.json', '.qbank')
+JSONL_SUFFIXES = ('.jsonl.gz', '.jsonl.zst', '.jsonl')
+READ_CHUNK = 1 << 18  # compressed bytes per read on the JSONL reader thread
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 10
+
+def bank_stem(filename):
+    """questions_test1.jsonl.gz -> questions_test1 (directory kept)"""
+    for suffix in BANK_SUFFIXES:
+        if filename.endswith(suffix):
+            return filename[:-len(suffix)]
+    return os.path.splitext(filename)[0]
+
+def compiled_path(filename):
+    """questions_test1.json -> questions_test1.qbank"""
+    return bank_stem(filename) + '.qbank'
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("pip install zstandard to read or write .zst banks") from None
+    return zstandard
+
+def open_jsonl(filename, mode='rb', fileobj=None):
+    """Binary stream over a JSONL bank, (de)compressed according to its suffix.
+    fileobj stands in for the file on disk (and is left open)."""
+    if filename.endswith('.gz'):
+        return gzip.open(fileobj or filename, mode, compresslevel=GZIP_LEVEL)
+    if filename.endswith('.zst'):
+        zstd = _zstd()
+        raw = fileobj or open(filename, mode)
+        if 'r' in mode:
+            return zstd.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=fileobj is None)
+        return zstd.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(raw, closefd=fileobj is None)
+    return fileobj or open(filename, mode)
+
+def _decoded_chunks(filename, fileobj=None):
+    """Decompressed bytes of a JSONL bank, a chunk at a time; corrupt or
+    truncated compressed data raises ValueError, like malformed JSON"""
+    new_stream, errors = None, ()
+    if filename.endswith('.gz'):
+        new_stream, errors = lambda: zlib.decompressobj(wbits=31), zlib.error
+    elif filename.endswith('.zst'):
+        zstd = _zstd()
+        new_stream, errors = lambda: zstd.ZstdDecompressor().decompressobj(), zstd.ZstdError
+    raw = fileobj or open(filename, 'rb')
+    try:
+        if new_stream is None:
+            yield from iter(lambda: raw.read(READ_CHUNK), b'')
+            return
+        # A decompressor object rather than GzipFile / stream_reader: one call per
+        # chunk that runs without the GIL, and a cut-off last member is noticed
+        stream, started = new_stream(), False
+        for data in iter(lambda: raw.read(READ_CHUNK), b''):
+            while data:
+                started = True
+                yield stream.decompress(data)
+                if not stream.eof:
+                    break
+                data = stream.unused_data  # next gzip member or zstd frame, if any
+                stream, started = new_stream(), False
+        if started:
+            raise ValueError(f"{filename} is truncated")
+    except errors as e:
+        raise ValueError(f"{filename}: {e}") from None
+    finally:
+        if fileobj is None:
+            raw.close()
+
+def iter_jsonl(filename, fileobj=None):
+    """Questions of a JSONL bank in file order. A reader thread fetches and
+    decompresses the next chunks (both release the GIL) while lines are parsed
+    here, and nothing is decompressed further ahead than a few chunks."""
+    chunks = queue.Queue(maxsize=8)
+    stop = threading.Event()
+
+    def read():
+        try:
+            for chunk in _decoded_chunks(filename, fileobj):
+                if stop.is_set():
+                    break
+                chunks.put(chunk)
+            chunks.put(None)
+        except Exception as e:
+            chunks.put(e)
+
+    threading.Thread(target=read, name='bank-reader', daemon=True).start()
+    rest = b''
+    try:
+        while True:
+            chunk = chunks.get()
+            if chunk is None:
+                break
+            if isinstance(chunk, Exception):
+                raise chunk
+            lines = (rest + chunk).split(b'\n')
+            rest = lines.pop()
+            # One json.loads per chunk: the lines joined into an array parse in a single C call
+            yield from json.loads(b'[' + b','.join(line for line in lines if line.strip()) + b']')
+        if rest.strip():
+            yield json.loads(rest)
+    finally:
+        stop.set()
+        while not chunks.empty():  # unblock the reader if we stopped early
+            chunks.get_nowait()
+
+def write_jsonl(filename, questions):
+    """Write a JSONL bank (compressed for .gz / .zst), one compact question per line"""
+    tmp = f"{filename}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as raw, open_jsonl(filename, 'wb', raw) as f:
+        for q in questions:
+            f.write(json.dumps(q, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n')
+    os.replace(tmp, filename)
+
+def iter_bank_file(filename):
+    """Raw question dicts of a JSON or JSONL bank file"""
+    if filename.endswith(JSONL_SUFFIXES):
+        return iter_jsonl(filename)
+    with open(filename, 'r', encoding='utf-8') as f:
+        return iter(json.load(f))
+
+def get_solution(questions, index):
+    """Solution text for one question, loaded lazily from compiled banks and papers"""
+    if hasattr(questions, 'solution'):
+        return questions.solution(index)
+    return questions[index]['solution']
+
+def parse_bank(filename):
+    """Parse a JSON or JSONL bank file into a tuple of read-only questions"""
+    return FrozenBank(freeze_question(q) for q in iter_bank_file(filename))
+
+def open_bank(filename):
+    """Open a bank file: compiled (.qbank), JSON, or JSONL (optionally .gz / .zst)"""
+    if filename.endswith('.qbank'):
+        return CompiledBank(filename)
+    return parse_bank(filename)
+
+def resolve_bank_file(filename):
+    """Prefer an up-to-date compiled bank next to a JSON file; JSON stays the fallback"""
+    compiled = compiled_path(filename)
+    try:
+        if os.stat(compiled).st_mtime_ns >= os.stat(filename).st_mtime_ns:
+            return compiled
+    except OSError:
+        pass
+    return filename
+
+def snapshot_dir(path, directory=SNAPSHOT_DIR):
+    """Where the versions of one bank file are kept, e.g. .bank_versions/questions_test1-3f2a9c1e"""
+    digest = hashlib.sha1(path.encode('utf-8')).hexdigest()[:8]
+    return os.path.join(directory, f"{bank_stem(os.path.basename(path))}-{digest}")
+
+def _save_snapshot(path, filename, key, version):
+    """Copy the file a version was loaded from, unless it changed since; then drop
+    copies of versions replaced more than SNAPSHOT_DAYS ago"""
+    directory = snapshot_dir(path)
+    target = os.path.join(directory, version + filename[len(bank_stem(filename)):])
+    if os.path.exists(target):
+        return
+    os.makedirs(directory, exist_ok=True)
+    tmp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+    shutil.copyfile(filename, tmp)
+    if bank_key(filename) != key:
+        os.remove(tmp)
+        return
+    os.replace(tmp, target)
+    with os.scandir(directory) as entries:
+        copies = sorted((e.stat().st_mtime, e.path) for e in entries if not e.name.endswith('.tmp'))
+    cutoff = time.time() - SNAPSHOT_DAYS * 86400
+    for (_, old), (replaced_at, _) in zip(copies, copies[1:]):
+        if replaced_at < cutoff:
+            os.remove(old)
+
+def _load_snapshot(path, version):
+    """A version of a bank from its copy on disk, or None if there is none"""
+    directory = snapshot_dir(path)
+    try:
+        names = [n for n in os.listdir(directory) if n.startswith(version + '.') and not n.endswith('.tmp')]
+    except FileNotFoundError:
+        return None
+    if not names:
+        return None
+    bank = open_bank(os.path.join(directory, names[0]))
+    bank.version = version
+    bank.derived = {}
+    return bank
+
+def _refresh(path):
+    """Load a new version of one bank if its file changed; returns the current version.
+    A file that fails to load keeps its previous version (it may be half written)."""
+    with _load_lock:
+        with _lock:
+            cached = _banks.get(path)
+        key = None
+        try:
+            filename = resolve_bank_file(path)
+            key = bank_key(filename)
+            if cached is not None and (cached[0] == key or _failed.get(path) == key):
+                return cached[1]
+            bank = open_bank(filename)
+            if bank_key(filename) != key:
+                raise ValueError(f"{filename} changed while loading")
+        except Exception:
+            # Half-written, malformed, or valid JSON that is not a list of questions
+            if cached is None:
+                raise
+            with _lock:
+                if path not in _failed or _failed[path] != key:
+                    _stats['errors'] += 1  # counted once per broken revision of the file
+                _failed[path] = key
+            return cached[1]
+        bank.version = f"{key[1]:x}-{key[2]:x}"
+        bank.derived = {}
+        try:
+            _save_snapshot(path, filename, key, bank.version)
+        except OSError as e:
+            log.warning("could not keep a copy of %s version %s: %s", path, bank.version, e)
+        with _lock:
+            _banks[path] = (key, bank)
+            _versions[(path, bank.version)] = bank
+            _failed.pop(path, None)
+            _stats['reloads' if cached is not None else 'misses'] += 1
+        return bank
+
+def get_bank(filename, check=False):
+    """Current version of a shared bank. Changed files are picked up by the watcher
+    thread, so this is a dictionary lookup; check=True looks at the file right away."""
+    path = os.path.abspath(filename)
+    if not check:
+        with _lock:
+            cached = _banks.get(path)
+            if cached is not None:
+                _stats['hits'] += 1
+                return cached[1]
+    bank = _refresh(path)
+    _start_watcher()
+    return bank
+
+def get_bank_version(filename, version):
+    """A specific version of a bank: the copy in memory if some attempt still holds it,
+    else the one kept on disk; None if neither is left"""
+    path = os.path.abspath(filename)
+    with _lock:
+        bank = _versions.get((path, version))
+    if bank is not None:
+        return bank
+    with _load_lock:
+        with _lock:
+            bank = _versions.get((path, version))
+        if bank is None:
+            try:
+                bank = _load_snapshot(path, version)
+            except Exception as e:
+                log.warning("could not load %s version %s from its copy: %s", path, version, e)
+                return None
+            if bank is not None:
+                with _lock:
+                    _versions[(path, version)] = bank
+        return bank
+
+def derived(bank, name, build):
+    """Data built from a bank (answer key, pool index), kept on that version so it
+    is dropped with it; sequences that aren't registry banks get a fresh build"""
+    cache = getattr(bank, 'derived', None)
+    if cache is None:
+        return build(bank)
+    with _derived_lock:
+        value = cache.get(name)
+        if value is None:
+            value = cache[name] = build(bank)
+        return value
+
+def reload_changed():
+    """Check every loaded bank once, loading new versions of changed files"""
+    with _lock:
+        paths = list(_banks)
+    for path in paths:
+        _refresh(path)
+
+def on_watch(callback):
+    """Run callback on the watcher thread after every pass over the loaded banks"""
+    with _lock:
+        if callback not in _hooks:
+            _hooks.append(callback)
+    _start_watcher()
+
+def _watch():
+    while True:
+        time.sleep(WATCH_INTERVAL)
+        with _lock:
+            hooks = list(_hooks)
+        for step in [reload_changed] + hooks:
+            try:
+                step()
+            except Exception:
+                log.exception("bank watcher step %s failed; retrying in %s s", step.__name__, WATCH_INTERVAL)
+
+def _start_watcher():
+    global _watcher
+    with _lock:
+        if _watcher is None and WATCH_INTERVAL > 0:
+            _watcher = threading.Thread(target=_watch, name='bank-watcher', daemon=True)
+            _watcher.start()
+
+def cache_stats():
+    """Hit/miss/reload counters, current banks and versions still in memory"""
+    with _lock:
+        return {**_stats, 'banks': len(_banks), 'versions': len(_versions)}
+
+def clear_cache():
+    with _lock:
+        _banks.clear()
+        _versions.clear()
+        _failed.clear()
+        for name in _stats:
+            _stats[name] = 0
@@ -0,0 +1,142 @@
+"""
+Question pools and randomized paper assembly for JEE Exam Simulator
+A pool is an ordinary bank file (pool_*.json / .qbank) holding many more
+questions than a paper. Every attempt draws its own paper from it, stratified
+by topic and difficulty, reproducibly from a per-attempt seed.
+"""
+
+import random
+import secrets
+from array import array
+from collections import defaultdict
+from collections.abc import Sequence
+
+from jee_core import SUBJECTS
+from question_bank import derived, get_solution
+
+# (subject, question types, questions drawn); order here is the order on the paper
+DEFAULT_BLUEPRINT = tuple(
+    section
+    for subject in SUBJECTS
+    for section in ((subject, ('mcq',), 20), (subject, ('numerical', 'decimal'), 5))
+)
+
+def question_topic(q):
+    tags = q.get('tags') or ()
+    return q.get('topic') or (tags[0] if tags else '')
+
+class PoolIndex:
+    """Positions of pool questions by subject, type, tag and difficulty"""
+
+    def __init__(self, questions):
+        self.questions = questions
+        self.ids = array('q')
+        self.by_id = {}
+        # (subject, type) -> (topic, difficulty) -> positions
+        self.strata = defaultdict(lambda: defaultdict(lambda: array('I')))
+        self.by_tag = defaultdict(lambda: array('I'))
+        self.by_difficulty = defaultdict(lambda: array('I'))
+        for i, q in enumerate(questions):
+            self.ids.append(q['id'])
+            self.by_id[q['id']] = i
+            self.strata[(q['subject'], q['type'])][(question_topic(q), q.get('difficulty'))].append(i)
+            for tag in q.get('tags') or ():
+                self.by_tag[tag].append(i)
+            self.by_difficulty[q.get('difficulty')].append(i)
+
+    def section_strata(self, subject, qtype):
+        """(topic, difficulty) strata of one subject and question type"""
+        return list(self.strata.get((subject, qtype), {}).values())
+
+def allocate(count, sizes):
+    """Split count draws across strata in proportion to their sizes (largest remainder)"""
+    total = sum(sizes)
+    if not total:
+        return [0] * len(sizes)
+    exact = [count * n / total for n in sizes]
+    alloc = [int(x) for x in exact]
+    by_remainder = sorted(range(len(sizes)), key=lambda i: exact[i] - alloc[i], reverse=True)
+    for i in by_remainder[:count - sum(alloc)]:
+        alloc[i] += 1
+    return alloc
+
+def draw(rng, stratum, k, taken, exclude_ids, ids, attempts_per_draw=8):
+    """Draw up to k unused positions from a stratum: O(1) expected per draw, then a scan fallback"""
+    picked = []
+    if not stratum:
+        return picked
+    for _ in range(k * attempts_per_draw):
+        if len(picked) == k:
+            return picked
+        pos = stratum[rng.randrange(len(stratum))]
+        if pos not in taken and ids[pos] not in exclude_ids:
+            taken.add(pos)
+            picked.append(pos)
+    rest = [p for p in stratum if p not in taken and ids[p] not in exclude_ids]
+    rng.shuffle(rest)
+    for pos in rest[:k - len(picked)]:
+        taken.add(pos)
+        picked.append(pos)
+    return picked
+
+def assemble_paper(index, seed, blueprint=DEFAULT_BLUEPRINT, exclude_ids=()):
+    """Pool positions for one paper; the same seed and exclusions give the same paper"""
+    rng = random.Random(seed)
+    exclude_ids = set(exclude_ids)
+    taken, positions = set(), []
+    for subject, types, count in blueprint:
+        # Section quota split across types, then across their strata, by pool share
+        by_type = [index.section_strata(subject, t) for t in types]
+        picked = [[] for _ in by_type]
+        per_type = allocate(count, [sum(len(s) for s in strata) for strata in by_type])
+        for strata, want, out in zip(by_type, per_type, picked):
+            for stratum, k in zip(strata, allocate(want, [len(s) for s in strata])):
+                if k:
+                    out.extend(draw(rng, stratum, k, taken, exclude_ids, index.ids))
+        # Strata that ran short (seen questions) are topped up from the rest of the section
+        for strata, out in zip(by_type, picked):
+            short = count - sum(map(len, picked))
+            if short > 0:
+                pooled = array('I', (p for s in strata for p in s))
+                out.extend(draw(rng, pooled, short, taken, exclude_ids, index.ids))
+        found = sum(map(len, picked))
+        if found < count:
+            raise ValueError(f"pool has only {found} unseen {subject} {'/'.join(types)} questions, need {count}")
+        for out in picked:
+            positions.extend(out)
+    return positions
+
+class Paper(Sequence):
+    """One student's paper: a view of pool questions, never a copy"""
+
+    def __init__(self, index, positions, seed=None):
+        self.pool = index.questions
+        self.positions = array('I', positions)
+        self.ids = array('q', (index.ids[p] for p in self.positions))
+        self.seed = seed
+
+    @classmethod
+    def from_ids(cls, index, ids, seed=None):
+        """Rebuild a stored paper; KeyError if the pool lost one of its questions"""
+        return cls(index, [index.by_id[i] for i in ids], seed)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        return self.pool[self.positions[i]]
+
+    def solution(self, i):
+        return get_solution(self.pool, self.positions[i])
+
+def get_pool_index(pool):
+    """Index for a shared pool bank, built once per bank version"""
+    return derived(pool, 'pool_index', PoolIndex)
+
+def new_paper(pool, exclude_ids=(), seed=None, blueprint=DEFAULT_BLUEPRINT):
+    """Draw a fresh paper with a new random seed"""
+    seed = secrets.randbits(63) if seed is None else seed
+    index = get_pool_index(pool)
+    return Paper(index, assemble_paper(index, seed, blueprint, exclude_ids), seed)
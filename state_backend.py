@@ -0,0 +1,381 @@
+"""
+Pluggable exam-state backends for JEE Exam Simulator
+Exam state lives outside the app process, so any worker behind a load balancer
+can serve any attempt. Pick one with JEE_STATE_BACKEND:
+
+    sqlite:///attempts.db   (default) shared SQLite file in WAL mode, write-behind
+    file:///attempts        one file per attempt, written synchronously
+
+Three slashes give a relative path, four an absolute one (sqlite:////var/jee/attempts.db).
+
+Every worker also sweeps the backend every JEE_SWEEP_INTERVAL seconds (default
+30, 0 turns it off) and submits started attempts whose deadline has passed, so
+an attempt whose browser tab was closed still counts in the cohort.
+"""
+
+import abc
+import atexit
+import hashlib
+import json
+import logging
+import os
+import secrets
+import struct
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from attempt_store import AttemptStore, COLUMNS, bank_version, paper_fields
+from exam_state import EXAM_DURATION
+
+DEFAULT_BACKEND = 'sqlite:///attempts.db'
+SWEEP_INTERVAL = float(os.environ.get('JEE_SWEEP_INTERVAL', 30))
+CLOCK_SLACK = 60  # seconds of clock difference allowed between workers
+
+log = logging.getLogger(__name__)
+
+def new_attempt_id():
+    return secrets.token_urlsafe(12)
+
+class StateBackend(abc.ABC):
+    """Interface shared by all backends; snapshots are dicts keyed like attempt_store.COLUMNS"""
+
+    @abc.abstractmethod
+    def save(self, attempt_id, test_file, exam, created_at=None, submitted=False):
+        """Store a snapshot of an ExamState; returns its updated_at"""
+
+    @abc.abstractmethod
+    def load(self, attempt_id):
+        """Newest snapshot of an attempt, or None"""
+
+    @abc.abstractmethod
+    def revision(self, attempt_id):
+        """updated_at of the newest snapshot, or None; cheap enough to call every rerun"""
+
+    @abc.abstractmethod
+    def iter_attempts(self, test_file=None, submitted_only=True, submitted_after=None, submitted_until=None):
+        """Stream snapshots; the submitted_* bounds select submissions in (after, until]"""
+
+    @abc.abstractmethod
+    def submit_expired(self, now=None):
+        """Submit (at now) every started attempt whose deadline has passed; returns how many"""
+
+    @abc.abstractmethod
+    def save_events(self, attempt_id, batch):
+        """Append one packed event_log batch"""
+
+    @abc.abstractmethod
+    def load_events(self, attempt_id):
+        """All event batches of an attempt, oldest first"""
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+class SQLiteBackend(AttemptStore, StateBackend):
+    """AttemptStore on a SQLite file that every worker opens; WAL lets them share it"""
+
+class FileBackend(StateBackend):
+    """One small binary file per attempt, replaced atomically on every save; every
+    read-modify-write holds the attempt's .lock file, so a save racing the sweep or
+    another worker can never write back a snapshot read before the attempt was submitted.
+    The .lock file is deleted again by every write of a submitted attempt.
+
+    Submissions are also appended to a per-test index under submissions/, one
+    "<submitted_at> <attempt_id>" line each, so iter_attempts() over submitted
+    attempts reads only the attempts it returns. The line is appended before the
+    snapshot is written: a crash in between leaves an entry that the reader drops
+    when the snapshot turns out unsubmitted, never a submission the index misses."""
+
+    META = struct.Struct('<I')  # length of the JSON metadata that precedes the arrays
+    FIELDS = ('test_file', 'current', 'deadline', 'seed', 'bank_version', 'created_at', 'updated_at', 'submitted_at')
+    BLOBS = ('answers', 'status', 'review', 'paper', 'times')
+
+    INDEX_DIR = 'submissions'
+    INDEX_READY = 'complete'  # written once the index covers every attempt saved before it
+    REVISIONS = 4096  # attempts whose file stamp and updated_at revision() remembers
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.index_dir = os.path.join(directory, self.INDEX_DIR)
+        self._swept_at = None
+        self._revisions = {}  # attempt_id -> (file stamp, updated_at), oldest first
+        self._revisions_lock = threading.Lock()
+        os.makedirs(self.index_dir, exist_ok=True)
+        ready = os.path.join(self.index_dir, self.INDEX_READY)
+        if not os.path.exists(ready) and not any(name.endswith('.attempt') for name in os.listdir(directory)):
+            open(ready, 'wb').close()  # nothing saved yet, so nothing to index
+
+    def _path(self, attempt_id, suffix='.attempt'):
+        if not attempt_id.replace('-', '').replace('_', '').isalnum():
+            raise ValueError(f"invalid attempt id {attempt_id!r}")
+        return os.path.join(self.directory, attempt_id + suffix)
+
+    @contextmanager
+    def _locked(self, attempt_id):
+        """Exclusive lock on one attempt, between threads as well as workers (the attempt
+        file itself is replaced on every write, so the lock lives in a file of its own).
+        The holder may delete the .lock file (_unlock_file); a waiter that then finds it
+        has locked a deleted file starts over on a fresh one."""
+        path = self._path(attempt_id, '.lock')
+        while True:
+            with open(path, 'ab') as f:
+                if not fcntl:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    try:
+                        yield
+                    finally:
+                        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+                    return
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    try:
+                        current = os.stat(path).st_ino == os.fstat(f.fileno()).st_ino
+                    except FileNotFoundError:
+                        current = False
+                    if current:
+                        yield
+                        return
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _unlock_file(self, attempt_id):
+        """Delete a submitted attempt's .lock file; call while holding the lock. Windows
+        can't delete a file that is open, so there it stays."""
+        if fcntl:
+            try:
+                os.remove(self._path(attempt_id, '.lock'))
+            except FileNotFoundError:
+                pass
+
+    def save(self, attempt_id, test_file, exam, created_at=None, submitted=False):
+        seed, paper = paper_fields(exam)
+        with self._locked(attempt_id):
+            previous = self._read(attempt_id) or {}
+            now = time.time()
+            if submitted and not previous.get('submitted_at'):
+                self._index_submission(test_file, attempt_id, now)
+            self._write(attempt_id, {
+                'test_file': test_file, 'current': exam.current, 'deadline': exam.deadline, 'seed': seed,
+                'bank_version': previous.get('bank_version') or bank_version(exam),
+                'created_at': previous.get('created_at') or created_at or now,
+                'updated_at': now,
+                'submitted_at': previous.get('submitted_at') or (now if submitted else None),
+                'answers': bytes(exam.answers), 'status': bytes(exam.status), 'review': bytes(exam.review),
+                'paper': paper, 'times': bytes(exam.time_spent) if exam.time_spent is not None else previous.get('times'),
+            })
+            if submitted or previous.get('submitted_at'):
+                self._unlock_file(attempt_id)
+        return now
+
+    def _write(self, attempt_id, snapshot):
+        """Replace an attempt's file with a snapshot dict"""
+        blobs = [snapshot[name] or b'' for name in self.BLOBS]
+        meta = {name: snapshot[name] for name in self.FIELDS}
+        meta['sizes'] = [len(blob) for blob in blobs]
+        meta = json.dumps(meta).encode('utf-8')
+        path = self._path(attempt_id)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(self.META.pack(len(meta)) + meta + b''.join(blobs))
+        os.replace(tmp, path)
+
+    def _read(self, attempt_id):
+        try:
+            with open(self._path(attempt_id), 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        (meta_len,) = self.META.unpack_from(data, 0)
+        offset = self.META.size + meta_len
+        meta = json.loads(data[self.META.size:offset])
+        blobs = []
+        for size in meta.pop('sizes'):
+            blobs.append(data[offset:offset + size])
+            offset += size
+        meta.update(attempt_id=attempt_id, answers=blobs[0], status=blobs[1], review=blobs[2],
+                    paper=blobs[3] if len(blobs) > 3 and blobs[3] else None,
+                    times=blobs[4] if len(blobs) > 4 and blobs[4] else None)
+        return {c: meta.get(c) for c in COLUMNS}
+
+    def load(self, attempt_id):
+        return self._read(attempt_id)
+
+    def save_events(self, attempt_id, batch):
+        with open(self._path(attempt_id, '.events'), 'ab') as f:
+            f.write(self.META.pack(len(batch)) + batch)
+
+    def load_events(self, attempt_id):
+        try:
+            with open(self._path(attempt_id, '.events'), 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return []
+        batches, offset = [], 0
+        while offset + self.META.size <= len(data):
+            (size,) = self.META.unpack_from(data, offset)
+            offset += self.META.size
+            batches.append(data[offset:offset + size])
+            offset += size
+        return batches
+
+    def revision(self, attempt_id):
+        """A stat while the attempt's file is unchanged; else only its metadata is read"""
+        path = self._path(attempt_id)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        with self._revisions_lock:
+            cached = self._revisions.get(attempt_id)
+        if cached is not None and cached[0] == (st.st_ino, st.st_mtime_ns, st.st_size):
+            return cached[1]
+        try:
+            with open(path, 'rb') as f:
+                st = os.fstat(f.fileno())
+                (meta_len,) = self.META.unpack(f.read(self.META.size))
+                updated_at = json.loads(f.read(meta_len))['updated_at']
+        except FileNotFoundError:
+            return None
+        with self._revisions_lock:
+            self._revisions.pop(attempt_id, None)
+            if len(self._revisions) >= self.REVISIONS:
+                del self._revisions[next(iter(self._revisions))]
+            self._revisions[attempt_id] = ((st.st_ino, st.st_mtime_ns, st.st_size), updated_at)
+        return updated_at
+
+    def _index_path(self, test_file):
+        name = hashlib.sha1(test_file.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.index_dir, name + '.idx')
+
+    def _index_submission(self, test_file, attempt_id, submitted_at):
+        # One small O_APPEND write per line, so lines from several workers never interleave
+        with open(self._index_path(test_file), 'ab') as f:
+            f.write(f"{submitted_at!r} {attempt_id}\n".encode('ascii'))
+
+    def _build_index(self):
+        """Index the submissions of a directory written before the index existed. A save
+        racing this only adds a duplicate line, which readers drop."""
+        for snapshot in self._scan():
+            if snapshot['submitted_at'] is not None:
+                self._index_submission(snapshot['test_file'], snapshot['attempt_id'], snapshot['submitted_at'])
+        open(os.path.join(self.index_dir, self.INDEX_READY), 'wb').close()
+
+    def _submissions(self, test_file):
+        """attempt_id -> submitted_at from the index, for one test or all of them"""
+        if not os.path.exists(os.path.join(self.index_dir, self.INDEX_READY)):
+            self._build_index()  # a directory from before the index
+        if test_file is not None:
+            paths = [self._index_path(test_file)]
+        else:
+            paths = [os.path.join(self.index_dir, name) for name in os.listdir(self.index_dir) if name.endswith('.idx')]
+        submissions = {}
+        for path in paths:
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+            except FileNotFoundError:
+                continue
+            for line in data.splitlines():
+                try:
+                    submitted_at, attempt_id = line.decode('ascii').split(' ')
+                    submissions[attempt_id] = float(submitted_at)
+                except ValueError:
+                    continue  # a line cut short by a crash
+        return submissions
+
+    def _scan(self):
+        for name in sorted(os.listdir(self.directory)):
+            if name.endswith('.attempt'):
+                snapshot = self._read(name[:-len('.attempt')])
+                if snapshot is not None:
+                    yield snapshot
+
+    def iter_attempts(self, test_file=None, submitted_only=True, submitted_after=None, submitted_until=None):
+        def wanted(submitted_at):
+            return ((submitted_after is None or submitted_at > submitted_after)
+                    and (submitted_until is None or submitted_at <= submitted_until))
+
+        if not (submitted_only or submitted_after is not None or submitted_until is not None):
+            for snapshot in self._scan():
+                if test_file is None or snapshot['test_file'] == test_file:
+                    yield snapshot
+            return
+        submissions = {a: t for a, t in self._submissions(test_file).items() if wanted(t)}
+        for attempt_id in sorted(submissions, key=submissions.get):
+            snapshot = self._read(attempt_id)
+            # The snapshot has the last word: the index may hold a line for a write that never happened
+            if (snapshot is None or snapshot['submitted_at'] is None or not wanted(snapshot['submitted_at'])
+                    or (test_file is not None and snapshot['test_file'] != test_file)):
+                continue
+            yield snapshot
+
+    def submit_expired(self, now=None):
+        # Only files saved since the previous sweep's horizon can hold an attempt that
+        # became due since: an older file's deadline had already passed at that sweep
+        now = now or time.time()
+
+        def due(snapshot):
+            return (snapshot is not None and snapshot['submitted_at'] is None and snapshot['deadline'] is not None
+                    and snapshot['deadline'] <= now)
+
+        horizon = self._swept_at - EXAM_DURATION - CLOCK_SLACK if self._swept_at else None
+        expired = 0
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if not entry.name.endswith('.attempt') or (horizon and entry.stat().st_mtime < horizon):
+                    continue
+                attempt_id = entry.name[:-len('.attempt')]
+                if not due(self._read(attempt_id)):
+                    continue  # checked again under the lock, which is only taken (and its file made) for these
+                with self._locked(attempt_id):
+                    snapshot = self._read(attempt_id)
+                    if due(snapshot):
+                        snapshot.update(submitted_at=now, updated_at=now)
+                        self._index_submission(snapshot['test_file'], attempt_id, now)
+                        self._write(attempt_id, snapshot)
+                        self._unlock_file(attempt_id)
+                        expired += 1
+        self._swept_at = now
+        return expired
+
+def open_backend(url):
+    """sqlite:///path or file:///directory -> backend"""
+    scheme, _, location = url.partition('://')
+    location = location[1:] if location.startswith('/') else location
+    if scheme == 'sqlite':
+        return SQLiteBackend(location or 'attempts.db')
+    if scheme == 'file':
+        return FileBackend(location or 'attempts')
+    raise ValueError(f"unknown state backend {url!r}")
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def _sweep(backend):
+    """Submit attempts past their deadline that no browser is left to submit"""
+    while True:
+        time.sleep(SWEEP_INTERVAL)
+        try:
+            backend.submit_expired()
+        except Exception:
+            log.exception("deadline sweep failed; retrying in %s s", SWEEP_INTERVAL)
+
+def get_backend():
+    """Process-wide backend from $JEE_STATE_BACKEND"""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = open_backend(os.environ.get('JEE_STATE_BACKEND', DEFAULT_BACKEND))
+            atexit.register(_backend.close)
+            if SWEEP_INTERVAL > 0:
+                threading.Thread(target=_sweep, args=(_backend,), name='deadline-sweep', daemon=True).start()
+        return _backend
@@ -0,0 +1,158 @@
+"""
+Test catalog index for JEE Exam Simulator
+Scans for question files (questions_*.json) and question pools (pool_*.json),
+also as JSONL (.jsonl, .jsonl.gz, .jsonl.zst) or compiled (.qbank) with no source
+next to them, only when the directory itself changes; a file edited in place is
+described again when its own mtime or size changes. Those changes are noticed, and
+the index rebuilt, by the bank watcher thread, so a lookup costs no stat or parse. Source files that differ only
+in format (questions_a.json and questions_a.jsonl.gz) are left out and reported.
+"""
+
+import hashlib
+import os
+import threading
+from collections import Counter
+from pathlib import Path
+
+from question_bank import JSONL_SUFFIXES, WATCH_INTERVAL, bank_stem, get_bank, on_watch
+
+SOURCE_SUFFIXES = ('.json',) + JSONL_SUFFIXES
+
+_lock = threading.Lock()
+_index = {'dir': None, 'dir_mtime': None, 'tests': [], 'failed': {},  # failed: file -> (mtime, size)
+          'conflicts': []}
+
+def test_name(path):
+    """questions_test1.json -> Test 1, questions_fiitjee_2020.jsonl.gz -> Fiitjee 2020, pool_jee_main.json -> Jee Main"""
+    stem = bank_stem(path.name)
+    if stem == 'questions':
+        return 'Default Test'
+    return stem.replace('questions_', '').replace('pool_', '', 1).replace('_', ' ').title()
+
+def is_pool(path):
+    return path.name.startswith('pool_')
+
+def file_hash(filename):
+    h = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def describe_test(path):
+    """Build catalog metadata for one question file"""
+    stat = path.stat()
+    questions = get_bank(str(path))  # the watcher pass that got here has loaded any new version
+    name = test_name(path)
+    pool = is_pool(path)
+    return {
+        'name': name,
+        'file': str(path),
+        'display': f"🎲 {name} (random paper)" if pool else f"📝 {name}",
+        'pool': pool,
+        'size': stat.st_size,
+        'mtime': stat.st_mtime_ns,
+        'hash': file_hash(path),
+        'total': len(questions),
+        'subjects': dict(Counter(q['subject'] for q in questions)),
+        'types': dict(Counter(q['type'] for q in questions)),
+    }
+
+def find_test_files(directory, conflicts=None):
+    """Default test, questions_* tests, then pool_* pools. A .qbank is listed on its own
+    (as build_bank.py writes it) only when no source file shares its stem; otherwise
+    it is that file's compiled copy. Source files sharing a stem would share a name
+    and a compiled file, so none of them is listed; each such group of names is
+    appended to conflicts instead."""
+    directory = Path(directory)
+
+    def matching(pattern):
+        by_stem = {}
+        for suffix in SOURCE_SUFFIXES:
+            for p in directory.glob(pattern + suffix):
+                by_stem.setdefault(bank_stem(p.name), []).append(p)
+        found = []
+        for stem, paths in by_stem.items():
+            if len(paths) == 1:
+                found += paths
+            elif conflicts is not None:
+                conflicts.append(tuple(sorted(p.name for p in paths)))
+        found += [p for p in directory.glob(pattern + '.qbank') if bank_stem(p.name) not in by_stem]
+        return sorted(found)
+
+    return matching('questions') + matching('questions_*') + matching('pool_*')
+
+def file_stamp(filename):
+    stat = os.stat(filename)
+    return stat.st_mtime_ns, stat.st_size
+
+def build_index(directory, previous=(), failed=None, conflicts=None):
+    """Describe every test file, reusing entries whose mtime and size are unchanged.
+    Returns (tests, failed): files that could not be described map to their (mtime, size),
+    so they are only tried again once they change."""
+    known = {t['file']: t for t in previous}
+    failed = failed or {}
+    tests, still_failed = [], {}
+    for path in find_test_files(directory, conflicts):
+        try:
+            stamp = file_stamp(path)
+        except OSError:
+            continue  # removed since the glob
+        old = known.get(str(path))
+        if old and (old['mtime'], old['size']) == stamp:
+            tests.append(old)
+        elif failed.get(str(path)) == stamp:
+            still_failed[str(path)] = stamp
+        else:
+            try:
+                tests.append(describe_test(path))
+            except Exception:
+                # Unreadable, malformed or not a list of questions (a draft, say);
+                # leave it out rather than fail the catalog every session reads
+                still_failed[str(path)] = stamp
+    return tests, still_failed
+
+def _changed(index):
+    """True if the directory or any indexed or failed file changed (or went away)"""
+    stamps = [(t['file'], (t['mtime'], t['size'])) for t in index['tests']] + list(index['failed'].items())
+    try:
+        return (os.stat(index['dir']).st_mtime_ns != index['dir_mtime']
+                or any(file_stamp(filename) != stamp for filename, stamp in stamps))
+    except OSError:
+        return True
+
+def _rebuild(directory, previous=(), failed=None):
+    """A fresh index for directory, reusing entries of the previous one that are unchanged"""
+    dir_mtime = os.stat(directory).st_mtime_ns
+    conflicts = []
+    tests, failed = build_index(directory, previous, failed, conflicts)
+    return {'dir': directory, 'dir_mtime': dir_mtime, 'tests': tests, 'failed': failed, 'conflicts': conflicts}
+
+def _check():
+    """Watcher hook: once anything the index covers changed, describe the changed files
+    here, off every session's rerun, and swap the new index in"""
+    with _lock:
+        index = dict(_index)
+    if index['dir'] is None or not _changed(index):
+        return
+    fresh = _rebuild(index['dir'], index['tests'], index['failed'])
+    with _lock:
+        if _index['dir'] == index['dir']:
+            _index.update(fresh)
+
+def get_catalog(directory='.'):
+    """Return indexed tests. The bank watcher rebuilds the index when a file changes,
+    so this is a lookup except on the first call for a directory (and, with the
+    watcher off, every call checks the files)."""
+    with _lock:
+        same_dir = _index['dir'] == directory
+        if not same_dir or (WATCH_INTERVAL <= 0 and _changed(_index)):
+            _index.update(_rebuild(directory, _index['tests'] if same_dir else (),
+                                   _index['failed'] if same_dir else None))
+            on_watch(_check)
+        return _index['tests']
+
+def catalog_conflicts():
+    """Groups of file names the last get_catalog() left out for sharing a stem"""
+    with _lock:
+        return list(_index['conflicts'])
@@ -0,0 +1,79 @@
+"""
+Regression tests for the attempt store's write-behind queue
+"""
+
+import sqlite3
+import time
+
+from attempt_store import AttemptStore
+from exam_state import ExamState
+
+QUESTIONS = [{'id': i, 'subject': 'Physics', 'type': 'mcq'} for i in range(3)]
+REJECT_BAD = """
+CREATE TRIGGER reject_bad BEFORE INSERT ON attempts WHEN NEW.test_file = 'bad.json'
+BEGIN SELECT RAISE(ABORT, 'rejected'); END
+"""
+
+def stored(path, attempt_id, column='current'):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(f"SELECT {column} FROM attempts WHERE attempt_id = ?", (attempt_id,)).fetchone()
+    finally:
+        conn.close()
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+def test_failed_rows_are_kept_and_retried(tmp_path):
+    path = str(tmp_path / 'attempts.db')
+    store = AttemptStore(path, flush_interval=0.02)
+    conn = sqlite3.connect(path)
+    conn.execute(REJECT_BAD)
+    conn.commit()
+
+    exam = ExamState(QUESTIONS)
+    store.save('bad', 'bad.json', exam)
+    store.save('good', 'questions.json', exam)
+    # The bad row neither kills the writer nor holds back the good one
+    wait_for(lambda: stored(path, 'good') is not None)
+    wait_for(lambda: store.stats()['errors'] > 0)
+    assert store._writer.is_alive()
+    assert stored(path, 'bad') is None
+    assert store.load('bad') is not None  # still queued, still readable
+
+    # A newer snapshot queued while the old one keeps failing is the one that lands
+    exam.current = 2
+    store.save('bad', 'bad.json', exam, submitted=True)
+    exam.current = 1
+    store.save('bad', 'bad.json', exam)
+    conn.execute("DROP TRIGGER reject_bad")
+    conn.commit()
+    conn.close()
+    wait_for(lambda: stored(path, 'bad') is not None)
+    assert stored(path, 'bad') == (1,)
+    assert stored(path, 'bad', 'submitted_at')[0] is not None
+    store.close()
+    assert store.stats()['pending'] == 0
+
+def test_flush_raises_while_rows_cannot_be_written(tmp_path):
+    path = str(tmp_path / 'attempts.db')
+    store = AttemptStore(path, flush_interval=60)
+    conn = sqlite3.connect(path)
+    conn.execute(REJECT_BAD)
+    conn.commit()
+    store.save('bad', 'bad.json', ExamState(QUESTIONS))
+    try:
+        store.flush()
+    except sqlite3.IntegrityError:
+        pass
+    else:
+        raise AssertionError("flush() reported success for a row it could not write")
+    assert store.stats()['pending'] == 1
+    conn.execute("DROP TRIGGER reject_bad")
+    conn.commit()
+    conn.close()
+    store.close()
+    assert stored(path, 'bad') == (0,)
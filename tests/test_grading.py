@@ -0,0 +1,104 @@
+"""
+Regression tests: vectorized grading scores sheets exactly as the original
+per-question loop did, for fixed tests and for papers drawn from a pool
+"""
+
+import random
+from pathlib import Path
+
+import pytest
+
+from grading import answers_to_row, grade_sheet
+from question_bank import get_bank
+from question_pool import Paper, get_pool_index
+
+BANK = str(Path(__file__).resolve().parent.parent / 'questions.json')
+SUBJECTS = ['Physics', 'Chemistry', 'Mathematics']
+
+def baseline_results(questions, answers):
+    """The app's original calculate_results, with answers passed in"""
+    total_score, correct, incorrect, unattempted = 0, 0, 0, 0
+    subject_stats = {s: {'correct': 0, 'incorrect': 0, 'unattempted': 0, 'score': 0} for s in SUBJECTS}
+    for i, q in enumerate(questions):
+        user_answer = answers[i]
+        subject = q['subject']
+        if user_answer is None:
+            unattempted += 1
+            subject_stats[subject]['unattempted'] += 1
+        else:
+            is_correct = False
+            if q['type'] == 'mcq':
+                is_correct = user_answer == q['correct']
+            elif q['type'] == 'numerical':
+                is_correct = user_answer == q['correct']
+            elif q['type'] == 'decimal':
+                is_correct = abs(float(user_answer) - float(q['correct'])) < 0.01
+            if is_correct:
+                correct += 1
+                subject_stats[subject]['correct'] += 1
+                total_score += 4
+                subject_stats[subject]['score'] += 4
+            else:
+                incorrect += 1
+                subject_stats[subject]['incorrect'] += 1
+                if i % 25 < 20:  # Negative marking only for Section A
+                    total_score -= 1
+                    subject_stats[subject]['score'] -= 1
+    return total_score, correct, incorrect, unattempted, subject_stats
+
+def random_sheet(rng, questions):
+    """Answers mixing right, wrong, near-miss decimal and unattempted"""
+    answers = []
+    for q in questions:
+        kind = rng.choice(('right', 'wrong', 'skip'))
+        if kind == 'skip':
+            answers.append(None)
+        elif q['type'] == 'mcq':
+            answers.append(q['correct'] if kind == 'right' else (q['correct'] + rng.randint(1, 3)) % 4)
+        elif q['type'] == 'numerical':
+            answers.append(q['correct'] if kind == 'right' else q['correct'] + rng.randint(1, 50))
+        else:
+            offset = rng.choice((0, 0.004, -0.009)) if kind == 'right' else rng.choice((0.02, -0.5, 3))
+            answers.append(round(float(q['correct']) + offset, 3))
+    return answers
+
+def assert_same(questions, answers):
+    total, correct, incorrect, unattempted, subject_stats = baseline_results(questions, answers)
+    result = grade_sheet(questions, answers_to_row(answers, len(questions)))
+    assert (result.total_score, result.correct, result.incorrect, result.unattempted) == \
+        (total, correct, incorrect, unattempted)
+    for subject in SUBJECTS:
+        assert result.subject_stats[subject] == subject_stats[subject], subject
+
+def shuffled_paper_positions(rng, questions):
+    """A full paper drawn from the bank: subjects in any order, questions shuffled
+    within each section, so every paper position keeps its section's marking"""
+    blocks = {q['subject']: [] for q in questions}
+    for p, q in enumerate(questions):
+        blocks[q['subject']].append(p)
+    positions = []
+    for subject in rng.sample(list(blocks), len(blocks)):
+        mcq = [p for p in blocks[subject] if questions[p]['type'] == 'mcq']
+        rest = [p for p in blocks[subject] if questions[p]['type'] != 'mcq']
+        positions += rng.sample(mcq, len(mcq)) + rng.sample(rest, len(rest))
+    return positions
+
+@pytest.mark.parametrize('seed', range(20))
+def test_fixed_test_scores_match_baseline(seed):
+    questions = get_bank(BANK)
+    assert_same(questions, random_sheet(random.Random(seed), questions))
+
+def test_edge_sheets_match_baseline():
+    questions = get_bank(BANK)
+    assert_same(questions, [None] * len(questions))
+    assert_same(questions, [q['correct'] for q in questions])
+    assert_same(questions, [(q['correct'] + 1) % 4 if q['type'] == 'mcq' else q['correct'] + 1 for q in questions])
+
+@pytest.mark.parametrize('seed', range(20))
+def test_pool_paper_scores_match_baseline(seed):
+    rng = random.Random(seed)
+    pool = get_bank(BANK)
+    paper = Paper(get_pool_index(pool), shuffled_paper_positions(rng, pool))
+    # grade_sheet on a Paper slices the pool's key with take(); the baseline reads the paper's questions
+    assert_same(list(paper), random_sheet(rng, paper))
+    assert_same(paper, random_sheet(rng, paper))
@@ -0,0 +1,47 @@
+"""
+Regression tests for version pinning: an attempt keeps the bank version it started on
+"""
+
+import json
+from pathlib import Path
+
+import pytest
+
+import jee_core
+import question_bank
+
+QUESTIONS = json.loads((Path(__file__).resolve().parent.parent / 'questions.json').read_text(encoding='utf-8'))
+
+@pytest.fixture
+def bank_file(tmp_path, monkeypatch):
+    # snapshots go to the relative .bank_versions/, so keep them in tmp_path
+    monkeypatch.chdir(tmp_path)
+    question_bank.clear_cache()
+    yield tmp_path / 'questions_pin.json'
+    question_bank.clear_cache()
+
+def ids(bank):
+    return [q['id'] for q in bank]
+
+def test_pinned_version_survives_rewrite_and_registry_reset(bank_file):
+    bank_file.write_text(json.dumps(QUESTIONS[:30]), encoding='utf-8')
+    filename = str(bank_file)
+    pinned = jee_core.load_questions(filename).version
+
+    bank_file.write_text(json.dumps(QUESTIONS[30:75]), encoding='utf-8')
+    current = question_bank.get_bank(filename, check=True)
+    assert current.version != pinned
+    assert ids(current) == ids(QUESTIONS[30:75])
+    assert ids(jee_core.load_questions(filename, pinned)) == ids(QUESTIONS[:30])
+
+    # With the registry reset nothing is in memory; the copy in .bank_versions/ is read back
+    question_bank.clear_cache()
+    assert list(Path('.bank_versions').iterdir())
+    old = jee_core.load_questions(filename, pinned)
+    assert old.version == pinned
+    assert ids(old) == ids(QUESTIONS[:30])
+    assert ids(jee_core.load_questions(filename)) == ids(QUESTIONS[30:75])
+
+def test_unknown_version_falls_back_to_current(bank_file):
+    bank_file.write_text(json.dumps(QUESTIONS[:30]), encoding='utf-8')
+    assert ids(jee_core.load_questions(str(bank_file), 'gone-1')) == ids(QUESTIONS[:30])
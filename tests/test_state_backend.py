@@ -0,0 +1,126 @@
+"""
+Regression tests for the file backend's attempt locks, submissions index and revision()
+"""
+
+import os
+import threading
+import time
+
+from exam_state import ExamState
+from state_backend import FileBackend
+
+QUESTIONS = [{'id': i, 'subject': 'Physics', 'type': 'mcq'} for i in range(3)]
+
+def started_exam(deadline):
+    exam = ExamState(QUESTIONS)
+    exam.start(duration=deadline - time.time())
+    return exam
+
+def lock_files(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith('.lock'))
+
+def test_lock_excludes_holders_while_its_file_is_deleted(tmp_path):
+    backend = FileBackend(str(tmp_path))
+    inside, overlaps = [], []
+    guard = threading.Lock()
+
+    def worker(n):
+        for i in range(50):
+            with backend._locked('a1'):
+                with guard:
+                    inside.append(n)
+                    if len(inside) > 1:
+                        overlaps.append(tuple(inside))
+                time.sleep(0.0005)
+                with guard:
+                    inside.remove(n)
+                if i % 3 == 0:
+                    backend._unlock_file('a1')  # a waiter already on the old file must not get in alongside a newcomer
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert overlaps == []
+
+def test_save_racing_the_sweep_keeps_the_submission(tmp_path):
+    backend = FileBackend(str(tmp_path))
+    exam = started_exam(time.time() - 1)
+    backend.save('a1', 'questions.json', exam)
+    stop = threading.Event()
+
+    def keep_saving():
+        while not stop.is_set():
+            backend.save('a1', 'questions.json', exam)
+
+    saver = threading.Thread(target=keep_saving)
+    saver.start()
+    try:
+        assert backend.submit_expired() == 1
+        time.sleep(0.05)
+    finally:
+        stop.set()
+        saver.join()
+    assert backend.load('a1')['submitted_at'] is not None
+
+def test_lock_files_are_removed_on_submit(tmp_path):
+    backend = FileBackend(str(tmp_path))
+    exam = started_exam(time.time() + 600)
+    backend.save('a1', 'questions.json', exam)
+    backend.save('a2', 'questions.json', started_exam(time.time() - 1))
+    assert lock_files(tmp_path) == ['a1.lock', 'a2.lock']
+
+    backend.save('a1', 'questions.json', exam, submitted=True)
+    assert backend.submit_expired() == 1
+    assert lock_files(tmp_path) == []
+    # Neither a later save of a submitted attempt nor another sweep leaves one behind
+    backend.save('a1', 'questions.json', exam)
+    assert backend.submit_expired() == 0
+    assert lock_files(tmp_path) == []
+
+def test_submissions_index_lists_only_submitted_attempts(tmp_path):
+    backend = FileBackend(str(tmp_path))
+    exam = started_exam(time.time() + 600)
+    backend.save('open', 'questions.json', exam)
+    backend.save('done', 'questions.json', exam, submitted=True)
+    backend.save('other', 'questions_2.json', exam, submitted=True)
+    backend.save('done', 'questions.json', exam, submitted=True)  # no second index line
+    # An entry whose snapshot write never happened, and a line cut short by a crash
+    backend._index_submission('questions.json', 'open', time.time())
+    with open(backend._index_path('questions.json'), 'ab') as f:
+        f.write(b'17000')
+
+    assert [s['attempt_id'] for s in backend.iter_attempts('questions.json')] == ['done']
+    assert sorted(s['attempt_id'] for s in backend.iter_attempts()) == ['done', 'other']
+    submitted_at = backend.load('done')['submitted_at']
+    assert list(backend.iter_attempts('questions.json', submitted_after=submitted_at)) == []
+    assert [s['attempt_id'] for s in backend.iter_attempts('questions.json', submitted_until=submitted_at)] == ['done']
+    assert sorted(s['attempt_id'] for s in backend.iter_attempts('questions.json', submitted_only=False)) == \
+        ['done', 'open']
+
+def test_submissions_index_is_built_for_an_older_directory(tmp_path):
+    backend = FileBackend(str(tmp_path))
+    exam = started_exam(time.time() + 600)
+    backend.save('done', 'questions.json', exam, submitted=True)
+    backend.save('open', 'questions.json', exam)
+    for name in os.listdir(backend.index_dir):
+        os.remove(os.path.join(backend.index_dir, name))
+
+    reopened = FileBackend(str(tmp_path))
+    assert [s['attempt_id'] for s in reopened.iter_attempts('questions.json')] == ['done']
+    assert os.path.exists(os.path.join(reopened.index_dir, FileBackend.INDEX_READY))
+    with open(reopened._index_path('questions.json'), 'rb') as f:
+        assert len(f.read().splitlines()) == 1
+
+def test_revision_follows_saves(tmp_path):
+    backend = FileBackend(str(tmp_path))
+    other = FileBackend(str(tmp_path))  # another worker on the same directory
+    exam = started_exam(time.time() + 600)
+    assert backend.revision('a1') is None
+    saved = backend.save('a1', 'questions.json', exam)
+    assert backend.revision('a1') == saved
+    assert backend.revision('a1') == saved
+    time.sleep(0.01)
+    saved = other.save('a1', 'questions.json', exam)
+    assert backend.revision('a1') == saved == backend.load('a1')['updated_at']